@@ -1,7 +1,12 @@
-import AI.config as cfg
-from AI.search import MiniMaxSearch
+__all__ = ["AI"]
 
 
-class AI(MiniMaxSearch):
-    def __init__(self):
-        super(AI, self).__init__(cfg.depth, cfg.breadth)
+def __getattr__(name: str):
+    """
+    Import the AI when it is first used, so that importing AI.config or
+    another light module of the package does not load the search.
+    """
+    if name == "AI":
+        from AI.player import AI
+        return AI
+    raise AttributeError(f"module 'AI' has no attribute '{name}'")
@@ -0,0 +1,153 @@
+import os
+import mmap
+import struct
+from typing import Optional
+
+from game import INVERSE, Gobang, transform
+from AI.patterns import CACHE
+
+__all__ = ["BOOK", "HEADER", "RECORD", "Book", "collect", "write"]
+
+BOOK = os.path.join(CACHE, "book.bin")
+
+HEADER = struct.Struct("<4sBBHI")  # Magic, size, connection, version, count
+RECORD = struct.Struct("<QBBHHH")  # Key, x, y, games, wins, losses
+MAGIC, VERSION = b"GOBK", 1
+
+
+class Book:
+    """
+    Read-only opening book.
+    Positions are keyed by their canonical key (see Gobang.canonical),
+    and the book stores the best move of each position in its canonical
+    form, with the statistics of the games it was played in.
+    The book is a sorted binary file (see write), looked up by binary search
+    in a memory map, so opening it costs nothing and only the pages visited
+    are loaded. Books are built by opening.py.
+    """
+    def __init__(self, path: str = BOOK):
+        """
+        :param path: Path of the book file. Default: BOOK.
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, self.connection, version, self.count = \
+            HEADER.unpack_from(self.data)
+        assert magic == MAGIC and version == VERSION, f"Bad book {path}"
+
+    def __len__(self):
+        return self.count
+
+    def __call__(self, game: Gobang, games: int = 1) -> Optional[tuple]:
+        """
+        :param game: Current chess game.
+        :param games: Minimum number of games of a book move. Default: 1.
+        :return: The book move of the game, None if the game is not in book.
+        """
+        if (game.size, game.connection) != (self.size, self.connection):
+            return None
+        key, t = game.canonical()
+        record = self.find(key)
+        if record is None or record[3] < games:
+            return None
+        x, y = transform(record[1], record[2], game.size, INVERSE[t])
+        return None if game.checkerboard[x, y] else (x, y)
+
+    def record(self, index: int) -> tuple:
+        """
+        :return: The record (key, x, y, games, wins, losses) at index.
+        """
+        return RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+
+    def find(self, key: int) -> Optional[tuple]:
+        """
+        Binary search of the record of key.
+        :return: The record of key, None if not found.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) >> 1
+            k, = struct.unpack_from(
+                "<Q", self.data, HEADER.size + middle * RECORD.size
+            )
+            if k < key:
+                low = middle + 1
+            elif k > key:
+                high = middle
+            else:
+                return self.record(middle)
+        return None
+
+    def close(self) -> None:
+        """
+        Unmap the book file.
+        """
+        self.data.close()
+
+
+def collect(statistics: dict,
+            moves: list,
+            winner: Optional[int],
+            plies: int,
+            size: int = 15,
+            connection: int = 5) -> None:
+    """
+    Add the opening of a game to the statistics.
+    :param statistics: {key: {(x, y): [games, wins, losses]}}, where moves
+                       are in the canonical orientation of the position.
+    :param moves: Moves of the game.
+    :param winner: Color of the winner, None for a tie.
+    :param plies: Number of opening moves to add.
+    :param size: The size of the chessboard. Default: 15.
+    :param connection: Number of consecutive pieces required for victory.
+                       Default: 5.
+    """
+    game = Gobang(size, connection)
+    for x, y in moves[:plies]:
+        key, t = game.canonical()
+        color = game.next
+        entry = statistics.setdefault(key, {}).setdefault(
+            transform(x, y, size, t), [0, 0, 0]
+        )
+        entry[0] += 1
+        entry[1] += winner == color
+        entry[2] += winner == -color
+        game.play(x, y)
+
+
+def write(path: str,
+          statistics: dict,
+          size: int = 15,
+          connection: int = 5,
+          games: int = 1) -> int:
+    """
+    Write the best move of each position as a book file.
+    The best move has the best score (wins - losses) / games,
+    ties are broken by the number of games.
+    :param path: Path of the book file.
+    :param statistics: Statistics of the positions, see collect.
+    :param size: The size of the chessboard. Default: 15.
+    :param connection: Number of consecutive pieces required for victory.
+                       Default: 5.
+    :param games: Minimum number of games of a book move. Default: 1.
+    :return: Number of records.
+    """
+    records = []
+    for key, moves in statistics.items():
+        (x, y), (n, wins, losses) = max(moves.items(), key=lambda item: (
+            (item[1][1] - item[1][2]) / item[1][0], item[1][0]
+        ))
+        if n >= games:
+            records.append((key, x, y, *(min(v, 0xFFFF) for v in (
+                n, wins, losses
+            ))))
+    records.sort()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp = f"{path}.{os.getpid()}"
+    with open(temp, "wb") as file:
+        file.write(HEADER.pack(MAGIC, size, connection, VERSION, len(records)))
+        for record in records:
+            file.write(RECORD.pack(*record))
+    os.replace(temp, path)
+    return len(records)
+
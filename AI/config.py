@@ -1,2 +1,17 @@
 depth: int = 1
 breadth: int = 1
+table: int = 1 << 20
+policy: str = "depth"
+budget: int = 0
+evaluation: str = "incremental"
+workers: int = 1
+ponder: int = 3
+profile: bool = False
+threat: str = "vcf"
+threat_nodes: int = 1000
+book: bool = True
+pvs: bool = True
+aspiration: int = 50
+deterministic: bool = False
+cache: int = 1 << 16
+eviction: str = "lru"
@@ -0,0 +1,264 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from game import Gobang
+from AI.patterns import offset, windows
+
+__all__ = ["coordinates", "line_score", "longest", "split",
+           "Evaluator", "VectorEvaluator", "BatchEvaluator"]
+
+
+def coordinates(size: int) -> list:
+    """
+    :return: Coordinates of the lines which may have patterns,
+             including all rows, columns and diagonals of length at least 4.
+    """
+    lines = []
+    for b in range(size):
+        lines.append([(b, i) for i in range(size)])
+        lines.append([(i, b) for i in range(size)])
+    for b in range(4 - size, size - 3):
+        lines.append([(i, b + i)
+                      for i in range(max(0, -b), min(size, size - b))])
+        lines.append([(i, b + size - i - 1)
+                      for i in range(max(0, b), min(size, size + b))])
+    return lines
+
+
+def line_score(line: np.ndarray, scores: dict) -> int:
+    """
+    Calculate the score of a line (row, column or diagonal) of the game.
+    :param line: Pieces of the line.
+    :param scores: Scores of the patterns, see MiniMaxSearch.scores.
+    """
+    s = 0
+    if np.array(np.where(line)).shape[1] < 2:
+        return s
+    for sgn in (-1, 1):
+        arr = sgn * line
+        for i in range(line.shape[0] - 3):
+            for length in (4, 5, 6):
+                if i + length >= line.shape[0]:
+                    break
+                p = arr[i: i + length]
+                if np.array(np.where(p)).shape[1] < 2:
+                    continue
+                p = tuple(p)
+                if p in scores:
+                    s += sgn * scores[p]
+    return s
+
+
+def longest(table: memoryview) -> int:
+    """
+    :param table: Table of lines, see AI.patterns.lines.
+    :return: Length of the longest lines of the table.
+    """
+    length = 0
+    while offset(length + 1) < len(table):
+        length += 1
+    return length
+
+
+def split(line: list, length: int) -> tuple[list, list]:
+    """
+    Split a line longer than the lines of the table.
+    The last cell of a line is never in a window (see line_score),
+    so two parts overlapping by 6 cells share the windows of the
+    overlap, and every window of the line is in one of the parts.
+    :param line: Coordinates of the line.
+    :param length: Length of the longest lines of the table.
+    :return: The parts, whose scores are added, and the overlaps,
+             whose scores are subtracted.
+    """
+    parts, overlaps = [], []
+    while len(line) > length:
+        assert length > 6, "The table of lines is too short"
+        parts.append(line[:length])
+        overlaps.append(line[length - 6: length])
+        line = line[length - 6:]
+    return parts + [line], overlaps
+
+
+class Evaluator:
+    """
+    Incremental evaluation of a chess game.
+    The score of every line is kept in sync with the moves played and revoked,
+    so only the four lines through the changed cell need to be rescored.
+    The number of lines containing a winning connection is tracked as well.
+    Lines longer than those of the table are split into overlapping parts,
+    see split.
+    """
+    def __init__(self, size: int, table: memoryview):
+        """
+        :param size: The size of the chessboard.
+        :param table: Table of lines, see AI.patterns.lines.
+        """
+        self.size = size
+        self.lines = []
+        self.table = table
+        self.history = []
+        self.cells = [[[] for _ in range(size)] for _ in range(size)]
+        self.overlaps = [[[] for _ in range(size)] for _ in range(size)]
+        self.length = longest(table)
+        for line in coordinates(size):
+            parts, overlaps = split(line, self.length)
+            for part in parts:
+                self.add(part)
+            for part in overlaps:
+                self.add(part, self.overlaps)
+        self.codes = list(map(offset, self.lines))
+        self.values = [table[code] for code in self.codes]
+        self.score = self.fives = 0
+
+    def add(self, line: list, cells: list = None) -> None:
+        """
+        Register a line given by its coordinates.
+        :param cells: The lines through each cell the line is added to.
+                      Default: self.cells, lines whose scores are added.
+        """
+        cells = self.cells if cells is None else cells
+        for position, (x, y) in enumerate(line):
+            cells[x][y].append((len(self.lines), 3 ** position))
+        self.lines.append(len(line))
+
+    def change(self, x: int, y: int, digit: int) -> None:
+        """
+        Add digit to the base-3 codes of the lines through (x, y),
+        and update the score and the number of fives.
+        """
+        table, codes, values = self.table, self.codes, self.values
+        for line, weight in self.cells[x][y]:
+            code = codes[line] + digit * weight
+            new, old = table[code], values[line]
+            self.score += (new >> 1) - (old >> 1)
+            self.fives += (new & 1) - (old & 1)
+            codes[line], values[line] = code, new
+        for line, weight in self.overlaps[x][y]:
+            code = codes[line] + digit * weight
+            new, old = table[code], values[line]
+            self.score -= (new >> 1) - (old >> 1)
+            self.fives -= (new & 1) - (old & 1)
+            codes[line], values[line] = code, new
+
+    def play(self, x: int, y: int, color: int) -> None:
+        """
+        Drop the pawn of color at (x, y).
+        """
+        digit = int(color) % 3
+        self.change(x, y, digit)
+        self.history.append((x, y, digit))
+
+    def revoke(self) -> tuple[int, int]:
+        """
+        Undo the last action.
+        :return: Coordinate of the last action.
+        """
+        x, y, digit = self.history.pop()
+        self.change(x, y, -digit)
+        return x, y
+
+    def reset(self, game: Gobang) -> None:
+        """
+        Synchronize with the checkerboard of the game.
+        """
+        self.score = self.fives = 0
+        self.history.clear()
+        self.codes = list(map(offset, self.lines))
+        self.values = [self.table[code] for code in self.codes]
+        for x, y in zip(*np.where(game.checkerboard)):
+            self.play(int(x), int(y), game.checkerboard[x, y])
+        self.history.clear()
+
+
+class VectorEvaluator:
+    """
+    Vectorized evaluation of a chess game.
+    All lines are stacked into one padded array of base-4 digits
+    (0 for empty, 1 for BLACK, 2 for WHITE and 3 for padding), then every
+    window is encoded at once and all scores are summed with one gather.
+    """
+    def __init__(self, size: int, scores: dict):
+        """
+        :param size: The size of the chessboard.
+        :param scores: Scores of the patterns, see AI.patterns.patterns.
+        """
+        self.size = size
+        index, padding = [], size * size
+        for line in coordinates(size):
+            # The last cell of a line is never in a window, see line_score.
+            line = [x * size + y for x, y in line[:-1]]
+            index.append(line + [padding] * (size - len(line)))
+        self.index = np.array(index)
+        tables, self.windows = [], []
+        for length in (4, 5, 6):
+            digits = (np.arange(4 ** length)[:, None] //
+                      4 ** np.arange(length) % 4)
+            table = windows(length, scores)[
+                np.minimum(digits, 2) @ 3 ** np.arange(length)
+            ]
+            table[(digits == 3).any(1)] = 0
+            self.windows.append(
+                (length, 4 ** np.arange(length), sum(map(len, tables)))
+            )
+            tables.append(table)
+        self.table = np.concatenate(tables)
+
+    def __call__(self, checkerboard: np.ndarray) -> int:
+        """
+        :return: The score of the checkerboard, same as MiniMaxSearch.score.
+        """
+        digits = np.append(checkerboard.ravel() % 3, 3)[self.index]
+        codes = [sliding_window_view(digits, length, 1) @ weights + offset
+                 for length, weights, offset in self.windows]
+        return int(self.table[np.concatenate(
+            [code.ravel() for code in codes]
+        )].sum())
+
+
+class BatchEvaluator:
+    """
+    Evaluation of many chess games at once.
+    Each line of each checkerboard is encoded as a base-3 code,
+    then all lines are scored by one gather from the table of lines.
+    Lines longer than those of the table are split as by Evaluator.
+    """
+    def __init__(self, size: int, table: memoryview, chunk: int = 4096):
+        """
+        :param size: The size of the chessboard.
+        :param table: Table of lines, see AI.patterns.lines.
+        :param chunk: Maximum number of checkerboards encoded at once,
+                      which bounds the memory used. Default: 4096.
+        """
+        self.size = size
+        self.chunk = chunk
+        self.table = np.frombuffer(table, np.int32)
+        length, lines, signs = longest(table), [], []
+        for line in coordinates(size):
+            parts, overlaps = split(line, length)
+            lines += parts + overlaps
+            signs += [1] * len(parts) + [-1] * len(overlaps)
+        width, padding = min(size, length), size * size
+        self.signs = np.array(signs)
+        self.index = np.full((len(lines), width), padding)
+        self.weights = np.zeros((len(lines), width), np.int64)
+        self.offsets = np.array([offset(len(line)) for line in lines])
+        for i, line in enumerate(lines):
+            self.index[i, :len(line)] = [x * size + y for x, y in line]
+            self.weights[i, :len(line)] = 3 ** np.arange(len(line))
+
+    def __call__(self, checkerboards: np.ndarray) -> np.ndarray:
+        """
+        :param checkerboards: An array of shape (N, size, size).
+        :return: An array of N scores, same as MiniMaxSearch.score.
+        """
+        checkerboards = checkerboards.reshape(len(checkerboards), -1)
+        scores = np.zeros(len(checkerboards), np.int64)
+        for start in range(0, len(checkerboards), self.chunk):
+            digits = checkerboards[start: start + self.chunk] % 3
+            digits = np.pad(digits, ((0, 0), (0, 1)))[:, self.index]
+            codes = (digits * self.weights).sum(2) + self.offsets
+            scores[start: start + self.chunk] = (
+                self.table[codes] >> 1
+            ) @ self.signs
+        return scores
@@ -0,0 +1,153 @@
+import os
+import mmap
+from hashlib import sha1
+
+import numpy as np
+
+from game import BLACK, WHITE
+
+__all__ = ["CACHE", "LENGTH", "patterns", "offset", "lines"]
+
+CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+LENGTH = 15  # Maximum length of the table of lines, 82 MB at 15
+
+_lines, _scores = {}, {}
+
+
+def patterns() -> dict:
+    """
+    :return: Scores of the patterns of BLACK, keyed by tuples of pieces.
+             The patterns of WHITE are the same with the colors swapped.
+             The scores are built once and shared, they must not be changed.
+    """
+    if _scores:
+        return _scores
+    n, p = sorted([BLACK, WHITE])
+    sleep2 = [(p, 0, 0, 0, p),
+              (n, p, p, 0, 0, 0),
+              (n, p, 0, p, 0, 0),
+              (n, p, 0, 0, p, 0)]
+    alive2 = [(p, 0, 0, p),
+              (0, p, 0, p, 0),
+              (0, 0, p, p, 0, 0)]
+    sleep3 = [(p, p, 0, 0, p),
+              (p, 0, p, 0, p),
+              (n, p, p, p, 0, 0),
+              (n, p, p, 0, p, 0),
+              (n, p, 0, p, p, 0)]
+    alive3 = [(0, p, p, p, 0),
+              (0, p, p, 0, p, 0)]
+    sleep4 = [(p, p, p, 0, p),
+              (p, p, 0, p, p),
+              (n, p, p, p, p, 0)]
+    alive4 = [(0, p, p, p, p, 0)]
+    for samples in (sleep2, sleep3, sleep4, alive2, alive3, alive4):
+        for sample in samples:
+            reverse = sample[::-1]
+            if reverse not in samples:
+                samples.append(reverse)
+    scores = {}
+    score = {"sleep2": 1, "sleep3": 50, "sleep4": 500,
+             "alive2": 5, "alive3": 500, "alive4": 10000}
+    for samples in score.keys():
+        for sample in eval(samples):
+            scores[sample] = score[samples]
+    _scores.update(scores)
+    return _scores
+
+
+def offset(length: int) -> int:
+    """
+    :return: Index of the first line of the length in the table of lines.
+    """
+    return (3 ** length - 1) >> 1
+
+
+def windows(length: int, scores: dict) -> np.ndarray:
+    """
+    :return: Scores of all windows of the length, indexed by base-3 codes.
+             Digit k of a code is the piece at position k of the window,
+             0 for empty, 1 for BLACK and 2 for WHITE.
+    """
+    table = np.zeros(3 ** length, np.int32)
+    for code in range(3 ** length):
+        window, c = [], code
+        for _ in range(length):
+            c, digit = divmod(c, 3)
+            window.append((0, BLACK, WHITE)[digit])
+        table[code] = (scores.get(tuple(window), 0) -
+                       scores.get(tuple(-piece for piece in window), 0))
+    return table
+
+
+def build(size: int, scores: dict, connection: int = 5) -> np.ndarray:
+    """
+    Build the table of all lines whose length is at most size.
+    The entry of a line is score * 2 + win, where score is the sum of the
+    scores of the windows on the line (see MiniMaxSearch.score) and win
+    is whether the line has connection consecutive pieces of a color.
+    The lines of each length are indexed by offset(length) + base-3 code.
+    """
+    tables = {length: windows(length, scores) for length in (4, 5, 6)}
+    fives = np.zeros(3 ** connection, bool)
+    fives[[offset(connection), offset(connection) << 1]] = True
+    table = np.zeros(offset(size + 1), np.int32)
+    score, win = np.zeros(1, np.int32), np.zeros(1, bool)
+    for length in range(1, size + 1):
+        codes = np.arange(3 ** length, dtype=np.int32)
+        score, win = np.tile(score, 3), np.tile(win, 3)
+        for window in (4, 5, 6):
+            i = length - window - 1
+            if i >= 0:
+                score += tables[window][codes // 3 ** i % 3 ** window]
+        i = length - connection
+        if i >= 0:
+            win |= fives[codes // 3 ** i]
+        table[offset(length): offset(length + 1)] = (score << 1) | win
+    return table
+
+
+def lines(size: int,
+          scores: dict,
+          connection: int = 5,
+          directory: str = CACHE) -> memoryview:
+    """
+    Get the table of lines, see build.
+    The table is built once and cached in the directory, later calls
+    memory-map the cached file, so only the pages used are loaded.
+    If the directory is not writable, the table is built in memory.
+    :param size: Maximum length of the lines, at most LENGTH, since the
+                 table grows as 3 ** size.
+    :param scores: Scores of the patterns, see patterns.
+    :param connection: Number of consecutive pieces required for victory.
+                       Default: 5.
+    :param directory: Cache directory. If None, the table won't be cached
+                      on disk. Default: CACHE.
+    :return: Table of the lines, indexing it gives a Python int.
+    :raise ValueError: If size is greater than LENGTH.
+    """
+    if size > LENGTH:
+        raise ValueError(f"The table of lines of length {size} is too large, "
+                         f"the maximum length is {LENGTH}")
+    digest = sha1(repr(sorted(scores.items())).encode()).hexdigest()[:12]
+    name = f"lines-{size}-{connection}-{digest}.bin"
+    if (name, directory) in _lines:
+        return _lines[name, directory]
+    if directory is None:
+        table = memoryview(build(size, scores, connection))
+    else:
+        path = os.path.join(directory, name)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(directory, exist_ok=True)
+                temp = f"{path}.{os.getpid()}"
+                build(size, scores, connection).tofile(temp)
+                os.replace(temp, path)
+            with open(path, "rb") as file:
+                table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return lines(size, scores, connection, None)
+        table = memoryview(table).cast("i")
+    _lines[name, directory] = table
+    return table
@@ -0,0 +1,27 @@
+import AI.config as cfg
+from AI.book import BOOK
+from AI.search import MiniMaxSearch
+
+__all__ = ["AI"]
+
+
+class AI(MiniMaxSearch):
+    def __init__(self):
+        super(AI, self).__init__(
+            cfg.depth,
+            cfg.breadth,
+            cfg.table,
+            cfg.policy,
+            cfg.budget,
+            cfg.evaluation,
+            cfg.workers,
+            cfg.profile,
+            threat=cfg.threat,
+            threat_nodes=cfg.threat_nodes,
+            book=BOOK if cfg.book else None,
+            pvs=cfg.pvs,
+            aspiration=cfg.aspiration,
+            deterministic=cfg.deterministic,
+            cache=cfg.cache,
+            eviction=cfg.eviction
+        )
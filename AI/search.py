@@ -1,95 +1,444 @@
-from typing import Union
-from random import choice
+import os
+import sys
+import logging
+from time import perf_counter
+from typing import Union, Optional
+from random import Random
+from collections import OrderedDict
 
 import numpy as np
 
-from game import Gobang, BLACK, WHITE
+from game import INVERSE, Gobang, transform
+from AI.book import Book
+from AI.stats import Statistics
+from AI.threat import ThreatSearch
+from AI.patterns import LENGTH, patterns, lines
+from AI.evaluate import line_score, Evaluator, VectorEvaluator, BatchEvaluator
+
+EXACT, LOWER, UPPER = tuple(range(3))  # Bound types of transposition entries
+
+_engines = {}  # Searchers of the worker processes, keyed by their settings
+
+logger = logging.getLogger(__name__)
+
+
+class Timeout(Exception):
+    """
+    Raised when the search runs out of its time budget.
+    """
+
+
+class Cancelled(Exception):
+    """
+    Raised when the search is cancelled by MiniMaxSearch.cancel.
+    """
+
+
+class TranspositionTable:
+    """
+    Transposition table with a bounded number of slots.
+    Each entry is a tuple (key, depth, bound, value, move).
+    """
+    def __init__(self, size: int = 1 << 20, policy: str = "depth"):
+        """
+        :param size: Number of slots in the table. Default: 1 << 20.
+        :param policy: Replacement policy when two positions share a slot.
+                       "depth": Keep the entry searched to a greater depth.
+                       "always": Always replace the old entry.
+                       Default: "depth".
+        """
+        assert policy in ("depth", "always"), f"Unknown policy {policy}"
+        self.size = size
+        self.policy = policy
+        self.slots = [None] * size
+        self.hits = self.probes = self.stores = self.entries = 0
+
+    def __len__(self):
+        return self.entries
+
+    @property
+    def stats(self) -> dict:
+        """
+        :return: Hit rate, number of entries and estimated memory usage.
+        """
+        entry = sys.getsizeof((0,) * 5) + 3 * sys.getsizeof(1 << 63)
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.,
+            "stores": self.stores,
+            "entries": self.entries,
+            "memory": sys.getsizeof(self.slots) + self.entries * entry
+        }
+
+    def get(self, key: int) -> Optional[tuple]:
+        """
+        :return: The entry of the position with key, None if not found.
+        """
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self,
+            key: int,
+            depth: int,
+            bound: int,
+            value: float,
+            move: Optional[tuple]) -> None:
+        """
+        Store a searched position.
+        :param key: Zobrist key of the position.
+        :param depth: Remaining search depth of the position.
+        :param bound: EXACT, LOWER or UPPER.
+        :param value: Score of the position.
+        :param move: Best move of the position.
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is None:
+            self.entries += 1
+        elif self.policy == "depth" and entry[0] != key and entry[1] > depth:
+            return
+        self.stores += 1
+        self.slots[index] = (key, depth, bound, value, move)
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset the statistics.
+        """
+        self.slots = [None] * self.size
+        self.hits = self.probes = self.stores = self.entries = 0
+
+
+class EvaluationCache:
+    """
+    Cache of the scores of the leaves with a bounded number of entries,
+    keyed by the Zobrist key of the position.
+    """
+    def __init__(self, size: int = 1 << 16, policy: str = "lru"):
+        """
+        :param size: Maximum number of entries. Default: 1 << 16.
+        :param policy: Eviction policy when the cache is full.
+                       "lru": Evict the least recently used entry.
+                       "clock": Evict the first entry not used since the
+                       clock hand last passed it, which approximates LRU
+                       without reordering on every hit.
+                       Default: "lru".
+        """
+        assert policy in ("lru", "clock"), f"Unknown policy {policy}"
+        self.size = size
+        self.policy = policy
+        self.scores = OrderedDict() if policy == "lru" else {}
+        self.keys, self.used, self.hand = [], bytearray(), 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def stats(self) -> dict:
+        """
+        :return: Hit rate, number of entries and estimated memory usage.
+        """
+        probes = self.hits + self.misses
+        entry = 2 * sys.getsizeof(1 << 63)
+        if self.policy == "clock":
+            entry += sys.getsizeof((0, 0)) + 9  # Tuple, key list, used bit
+        return {
+            "probes": probes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.,
+            "entries": len(self.scores),
+            "memory": sys.getsizeof(self.scores) + len(self.scores) * entry
+        }
+
+    def get(self, key: int) -> Optional[float]:
+        """
+        :return: The score of the position with key, None if not found.
+        """
+        entry = self.scores.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == "lru":
+            self.scores.move_to_end(key)
+            return entry
+        self.used[entry[0]] = 1
+        return entry[1]
+
+    def put(self, key: int, score: float) -> None:
+        """
+        Store the score of a position, evicting an entry if full.
+        """
+        if self.policy == "lru":
+            self.scores[key] = score
+            self.scores.move_to_end(key)
+            if len(self.scores) > self.size:
+                self.scores.popitem(last=False)
+            return
+        entry = self.scores.get(key)
+        if entry is not None:
+            self.scores[key] = entry[0], score
+            self.used[entry[0]] = 1
+            return
+        if len(self.keys) < self.size:
+            index = len(self.keys)
+            self.keys.append(key)
+            self.used.append(0)
+        else:
+            while self.used[self.hand]:
+                self.used[self.hand] = 0
+                self.hand = (self.hand + 1) % self.size
+            index = self.hand
+            del self.scores[self.keys[index]]
+            self.keys[index] = key
+            self.hand = (self.hand + 1) % self.size
+        self.scores[key] = index, score
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset the statistics.
+        """
+        self.scores.clear()
+        self.keys, self.used, self.hand = [], bytearray(), 0
+        self.hits = self.misses = 0
 
 
 class MiniMaxSearch:
     """
     Minimax search algorithm using alpha-beta pruning
     """
-    def __init__(self, depth: int, breadth: int = 0):
+    def __init__(self,
+                 depth: int,
+                 breadth: int = 0,
+                 table: int = 0,
+                 policy: str = "depth",
+                 budget: int = 0,
+                 evaluation: str = "incremental",
+                 workers: int = 1,
+                 profile: bool = False,
+                 seed: Optional[int] = None,
+                 threat: str = "",
+                 threat_nodes: int = 1000,
+                 book: Union[str, Book, None] = None,
+                 symmetric: bool = False,
+                 pvs: bool = False,
+                 aspiration: int = 0,
+                 deterministic: bool = False,
+                 cache: int = 0,
+                 eviction: str = "lru"):
         """
         :param depth: Maximum search depth.
         :param breadth: Maximum search breadth.
                         If set to 0, the breadth will be unlimited. Default: 0.
+        :param table: Number of slots in the transposition table.
+                      If set to 0, no table will be used. Default: 0.
+        :param policy: Replacement policy of the transposition table,
+                       see TranspositionTable. Default: "depth".
+        :param budget: Time budget of each move in milliseconds.
+                       If set to 0, search to the maximum depth directly.
+                       Otherwise, use iterative deepening up to the maximum
+                       depth until the budget runs out. Default: 0.
+        :param evaluation: Evaluation of the leaves.
+                           "incremental": Use the incremental Evaluator.
+                           "vectorized": Use the VectorEvaluator.
+                           "scalar": Use MiniMaxSearch.score.
+                           All of them give the same score.
+                           Default: "incremental".
+        :param workers: Number of processes used by the search.
+                        If greater than 1, the moves of the root are searched
+                        in parallel by a process pool (only when budget == 0).
+                        Default: 1.
+        :param profile: Whether to collect the statistics of each call,
+                        see AI.stats.Statistics. The statistics are kept in
+                        stats and logged at the INFO level. Default: False.
+        :param seed: Seed of the random choices among equally good moves.
+                     If None, the choices are not reproducible. Default: None.
+        :param threat: Threat-space search before the alpha-beta search,
+                       see AI.threat.ThreatSearch.
+                       "vcf": Search victories by continuous fours.
+                       "vct": Search victories by continuous threats.
+                       "": No threat-space search. Default: "".
+        :param threat_nodes: Maximum number of nodes of the threat-space
+                             search of each move. Default: 1000.
+        :param book: Path of the opening book, see AI.book,
+                     or a Book shared with other searchers.
+                     If None or the file does not exist, no book will be used.
+                     Default: None.
+        :param symmetric: Whether symmetric positions share the entries of
+                          the transposition table, see Gobang.canonical.
+                          The evaluation is not exactly symmetric, so the
+                          result may differ from the search without it.
+                          Default: False.
+        :param pvs: Whether to use principal variation search, which
+                    searches the moves after the first one of each node with
+                    a null window, and searches again only the moves which
+                    may be better. The best moves are the same as those of
+                    the full window search. Default: False.
+        :param aspiration: Half width of the aspiration window of the root
+                           in iterative deepening, around the score of the
+                           previous iteration. The root is searched again
+                           with a full window if the score falls outside.
+                           If set to 0, no aspiration window. Default: 0.
+        :param deterministic: Whether to choose the first of equally good
+                              moves in move order, instead of a random one.
+                              Default: False.
+        :param cache: Number of entries of the evaluation cache,
+                      see EvaluationCache. The cache is kept between calls,
+                      so the leaves of the previous moves are reused.
+                      It is only used by the "vectorized" and "scalar"
+                      evaluations, since the incremental score is known
+                      without evaluating. If set to 0, no cache will be used.
+                      Default: 0.
+        :param eviction: Eviction policy of the evaluation cache,
+                         "lru" or "clock". Default: "lru".
         """
-        n, p = sorted([BLACK, WHITE])
-        sleep2 = [(p, 0, 0, 0, p),
-                  (n, p, p, 0, 0, 0),
-                  (n, p, 0, p, 0, 0),
-                  (n, p, 0, 0, p, 0)]
-        alive2 = [(p, 0, 0, p),
-                  (0, p, 0, p, 0),
-                  (0, 0, p, p, 0, 0)]
-        sleep3 = [(p, p, 0, 0, p),
-                  (p, 0, p, 0, p),
-                  (n, p, p, p, 0, 0),
-                  (n, p, p, 0, p, 0),
-                  (n, p, 0, p, p, 0)]
-        alive3 = [(0, p, p, p, 0),
-                  (0, p, p, 0, p, 0)]
-        sleep4 = [(p, p, p, 0, p),
-                  (p, p, 0, p, p),
-                  (n, p, p, p, p, 0)]
-        alive4 = [(0, p, p, p, p, 0)]
-        for samples in (sleep2, sleep3, sleep4, alive2, alive3, alive4):
-            for sample in samples:
-                reverse = sample[::-1]
-                if reverse not in samples:
-                    samples.append(reverse)
-        self.scores = {}
-        score = {"sleep2": 1, "sleep3": 50, "sleep4": 500,
-                 "alive2": 5, "alive3": 500, "alive4": 10000}
-        for samples in score.keys():
-            for sample in eval(samples):
-                self.scores[sample] = score[samples]
+        assert evaluation in ("incremental", "vectorized", "scalar"), \
+            f"Unknown evaluation {evaluation}"
+        assert threat in ("", "vcf", "vct"), f"Unknown threat {threat}"
+        self.scores = patterns()
+        self.settings = tuple(dict(
+            depth=depth, breadth=breadth, table=table, policy=policy,
+            evaluation=evaluation, symmetric=symmetric, pvs=pvs,
+            cache=cache, eviction=eviction
+        ).items())
+        self.pv = []
+        self.best = []
+        self.value = 0
+        self.pondered = {}
+        self.line = []
+        self.history = {}
+        self.killers = []
+        self.follow = False
+        self.deadline = None
+        self.cancelled = False
+        self.budget = budget
         self.depth = depth << 1
         self.breadth = breadth
+        self.evaluator = None
+        self.batcher = None
+        self.vectorizer = None
+        self.evaluation = evaluation
+        self.pool, self.workers = None, workers
+        self.table = TranspositionTable(table, policy) if table else None
+        self.cache = EvaluationCache(cache, eviction) \
+            if cache and evaluation != "incremental" else None
+        self.symmetric = symmetric
+        self.pvs = pvs
+        self.random = Random(seed)
+        self.aspiration = aspiration
+        self.deterministic = deterministic
+        self.threat = threat
+        self.solver = ThreatSearch(nodes=threat_nodes) if threat else None
+        if isinstance(book, Book):
+            self.book = book
+        else:
+            self.book = Book(book) if book and os.path.exists(book) else None
+        self.stats = Statistics() if profile else None
+        if profile:
+            for name in ("expand", "order", "evaluate"):
+                method = getattr(self, name)
+                setattr(self, name, self.stats.timed(name, method))
 
     def __call__(self, game: Gobang) -> tuple[int, int]:
         """
         :param game: Current chess game.
         :return: The best position for the next step.
+        :raise Cancelled: If cancel is called during the search,
+                          or before it since the last resume.
+        """
+        if self.stats is None:
+            return self.choose(game)
+        self.stats.reset(self.table, self.cache)
+        try:
+            return self.choose(game)
+        finally:
+            self.stats.stop(self.table, self.cache)
+            logger.info("step %d: %s", game.step, self.stats)
+
+    def choose(self, game: Gobang) -> tuple[int, int]:
+        """
+        Choose the position for the next step, without profiling.
         """
+        move = self.pondered.get(game.key)
+        self.pondered.clear()
+        if move is not None and not game.checkerboard[move]:
+            return move
+        if self.book is not None:
+            move = self.book(game)
+            if move is not None:
+                return move
         step = game.step
         if step > 1:
-            return self.search(game)
+            return self.decide(game)
         if step == 1:
             x, y = game.history[0]
-            x += choice([-1, 1])
-            y += choice([-1, 1])
-            return max(min(x, game.size), 0), max(min(y, game.size), 0)
+            dx, dy = self.pick([-1, 1]), self.pick([-1, 1])
+            x = x + dx if 0 <= x + dx < game.size else x - dx
+            y = y + dy if 0 <= y + dy < game.size else y - dy
+            return x, y
         return game.size >> 1, game.size >> 1
 
+    def decide(self, game: Gobang) -> tuple[int, int]:
+        """
+        Search the best position with the configured search.
+        A win found by the threat-space search is played at once.
+        """
+        if self.solver is not None:
+            move = self.solver(game, self.threat == "vct")
+            if move is not None:
+                self.best = [move]
+                return move
+        if self.budget:
+            return self.deepen(game, self.budget)
+        if self.workers > 1:
+            return self.split(game)
+        return self.search(game)
+
+    def pick(self, moves: list):
+        """
+        Choose one of equally good moves.
+        """
+        if self.deterministic:
+            return moves[0]
+        return self.random.choice(moves)
+
+    def ponder(self, game: Gobang, width: int = 3) -> None:
+        """
+        Search on the opponent's time.
+        The most likely replies of the opponent are predicted by move ordering,
+        and the best answer to each of them is searched in advance.
+        If the opponent plays one of them, the next call returns the answer
+        at once, otherwise the answers are discarded.
+        :param game: Current chess game, where the opponent is to move.
+        :param width: Number of replies to predict. Default: 3.
+        :raise Cancelled: If cancel is called during pondering,
+                          or before it since the last resume.
+        """
+        self.pondered.clear()
+        self.prepare(game)
+        for x, y in self.order(game, self.expand(game), 0, [])[:width]:
+            if game.play(x, y):
+                game.revoke()
+                continue
+            try:
+                self.pondered[game.key] = self.decide(game)
+            finally:
+                game.revoke()
+
     def score(self, game: Gobang) -> int:
         """
         Calculate the score of the game.
         """
-        def part_score(array):
-            s = 0
-            if np.array(np.where(array)).shape[1] < 2:
-                return s
-            for sgn in (-1, 1):
-                arr = sgn * array
-                for i in range(game.size - 3):
-                    for length in (4, 5, 6):
-                        if i + length >= array.shape[0]:
-                            break
-                        p = arr[i: i + length]
-                        if np.array(np.where(p)).shape[1] < 2:
-                            continue
-                        p = tuple(p)
-                        if p in self.scores:
-                            s += sgn * self.scores[p]
-            return s
-
         score = 0
         for b in range(game.size):
             for part in (game.checkerboard[b, :], game.checkerboard[:, b]):
-                score += part_score(part)
+                score += line_score(part, self.scores)
         for b in range(4 - game.size, game.size - 3):
             for part in (
                     [game.checkerboard[i, b + i] for i in range
@@ -97,28 +446,236 @@ class MiniMaxSearch:
                     [game.checkerboard[i, b + game.size - i - 1] for
                      i in range(max(0, b), min(game.size, game.size + b))]
             ):
-                score += part_score(np.array(part))
+                score += line_score(np.array(part), self.scores)
         return score
 
+    def evaluate(self, game: Gobang) -> int:
+        """
+        Evaluate a leaf of the search with the configured evaluation.
+        """
+        if self.evaluation == "incremental":
+            return self.evaluator.score
+        if self.cache is not None:
+            score = self.cache.get(game.key)
+            if score is not None:
+                return score
+        if self.evaluation == "vectorized":
+            score = self.vectorizer(game.checkerboard)
+        else:
+            score = self.score(game)
+        if self.cache is not None:
+            self.cache.put(game.key, score)
+        return score
+
+    def batch(self, checkerboards: np.ndarray, connection: int = 5) -> \
+            np.ndarray:
+        """
+        Calculate the scores of many checkerboards at once.
+        :param checkerboards: An int8 array of shape (N, size, size).
+        :param connection: Number of consecutive pieces required for victory.
+                           Default: 5.
+        :return: An array of N scores, same as calling score on each game.
+        """
+        size = checkerboards.shape[-1]
+        if self.batcher is None or self.batcher.size != size:
+            self.batcher = BatchEvaluator(
+                size, lines(min(size, LENGTH), self.scores, connection)
+            )
+        return self.batcher(checkerboards)
+
     def expand(self, game: Gobang) -> list:
         """
         Return the extensions of the game.
         """
         if not self.breadth:
-            return game.empty
-        neighbors = set()
-        for x0, y0 in game.history[::-1]:
-            for x in range(
-                    max(0, x0 - self.breadth),
-                    min(game.size, x0 + self.breadth + 1)
-            ):
-                for y in range(
-                        max(0, y0 - self.breadth),
-                        min(game.size, y0 + self.breadth + 1)
-                ):
-                    if not game.checkerboard[x, y]:
-                        neighbors.add((x, y))
-        return list(neighbors)
+            return list(map(tuple, game.empty))
+        return list(game.frontier(self.breadth))
+
+    def order(self,
+              game: Gobang,
+              moves: list,
+              depth: int,
+              first: list) -> list:
+        """
+        Sort the moves so that alpha-beta pruning happens as early as possible.
+        Moves are searched in the order of: immediate wins, forced blocks,
+        the moves in first, killer moves, then the others by their static
+        score (the patterns each move creates and blocks) plus history score.
+        If the children are leaves, moves are simply sorted by their scores.
+        :param game: Current chess game, synchronized with the evaluator.
+        :param moves: Moves to sort.
+        :param depth: Current search depth.
+        :param first: Moves known to be good, such as PV and hash moves.
+        :return: Sorted moves.
+        """
+        keys = {}
+        evaluator = self.evaluator
+        color, fives = game.next, evaluator.fives
+        for x, y in moves:
+            evaluator.play(x, y, color)
+            attack, win = evaluator.score, evaluator.fives > fives
+            evaluator.revoke()
+            if depth + 1 == self.depth:
+                keys[x, y] = (win, color * attack)
+                continue
+            evaluator.play(x, y, -color)
+            defend, block = evaluator.score, evaluator.fives > fives
+            evaluator.revoke()
+            if win:
+                priority = 4
+            elif block:
+                priority = 3
+            elif (x, y) in first:
+                priority = 2
+            elif (x, y) in self.killers[depth]:
+                priority = 1
+            else:
+                priority = 0
+            keys[x, y] = (priority, color * (attack - defend) +
+                          self.history.get((x, y), 0))
+        return sorted(moves, key=keys.__getitem__, reverse=True)
+
+    def key(self, game: Gobang) -> tuple[int, int]:
+        """
+        :return: (key, t), where key is the key of the game in the
+                 transposition table, and transform(x, y, size, t) maps
+                 a move of the game to the move stored in the table.
+        """
+        if self.symmetric:
+            return game.canonical()
+        return game.key, 0
+
+    def prepare(self, game: Gobang) -> None:
+        """
+        Prepare for searching the game from its current position.
+        """
+        self.line = [[] for _ in range(self.depth + 1)]
+        if self.evaluator is None or self.evaluator.size != game.size:
+            self.evaluator = Evaluator(game.size, lines(
+                min(game.size, LENGTH), self.scores, game.connection
+            ))
+        if self.evaluation == "vectorized" and (
+                self.vectorizer is None or self.vectorizer.size != game.size
+        ):
+            self.vectorizer = VectorEvaluator(game.size, self.scores)
+        self.evaluator.reset(game)
+        self.killers = [[] for _ in range(self.depth)]
+        for move in self.history:
+            self.history[move] >>= 1
+
+    def branch(self,
+               game: Gobang,
+               x: int,
+               y: int,
+               alpha: float = -float("inf"),
+               beta: float = float("inf")) -> float:
+        """
+        Search the game after playing (x, y).
+        :return: The score of the move, which is exact if it is
+                 in [alpha, beta], otherwise it is a bound.
+        """
+        self.prepare(game)
+        color = game.next
+        if game.play(x, y, color):
+            game.revoke()
+            return np.sign(color) * np.inf
+        self.evaluator.play(x, y, color)
+        try:
+            return self.search(game, 1, alpha, beta)
+        finally:
+            self.evaluator.revoke()
+            game.revoke()
+
+    def split(self, game: Gobang) -> tuple[int, int]:
+        """
+        Root-parallel search.
+        The first move of the root is searched here with a full window,
+        then its score bounds the window of the other moves, which are
+        searched in parallel by a process pool. A move as good as the best
+        one always gets its exact score, so the best moves are the same as
+        those of search.
+        :param game: Current chess game.
+        :return: The best placement position.
+        """
+        self.prepare(game)
+        color = game.next
+        moves = self.order(game, self.expand(game), 0, [])
+        for x, y in moves:
+            win = game.play(x, y, color)
+            game.revoke()
+            if win:
+                return x, y
+        if self.pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(self.workers)
+        history = [(x, y) for x, y in game.history]
+        values = [self.branch(game, *moves[0])]
+        window = (values[0], np.inf) if color > 0 else (-np.inf, values[0])
+        values += self.pool.map(_branch, [
+            (self.settings, game.size, game.connection, history, move, window)
+            for move in moves[1:]
+        ])
+        value = (max if color > 0 else min)(values)
+        self.best = [move for move, v in zip(moves, values) if v == value]
+        return self.pick(self.best)
+
+    def cancel(self) -> None:
+        """
+        Cancel the running search, which may be running in another thread.
+        The game being searched is restored before Cancelled is raised.
+        """
+        self.cancelled = True
+
+    def resume(self) -> None:
+        """
+        Clear a previous cancel, so that the next search can run.
+        Called before the search is started in another thread,
+        so that a cancel made before the search begins is not lost.
+        """
+        self.cancelled = False
+
+    def close(self) -> None:
+        """
+        Shut down the process pool of the parallel search.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def deepen(self, game: Gobang, budget: float) -> tuple[int, int]:
+        """
+        Iterative deepening search.
+        The search depth grows by one round per iteration until the maximum
+        depth is reached or the time budget runs out. The principal variation
+        of each iteration is searched first in the next iteration, and its
+        score centers the aspiration window of the next iteration.
+        :param game: Current chess game.
+        :param budget: Time budget in milliseconds.
+                       The first iteration always completes.
+        :return: The best position found by the deepest completed iteration.
+        """
+        depth, start = self.depth, perf_counter()
+        self.pv, move, value = [], None, None
+        try:
+            for self.depth in range(2, depth + 1, 2):
+                self.follow = True
+                if self.aspiration and value is not None \
+                        and np.isfinite(value):
+                    alpha = value - self.aspiration
+                    beta = value + self.aspiration
+                    move = self.search(game, 0, alpha, beta)
+                    if not alpha <= self.value <= beta:
+                        self.follow = True
+                        move = self.search(game)
+                else:
+                    move = self.search(game)
+                self.pv, value = self.line[0], self.value
+                self.deadline = start + budget / 1000
+        except Timeout:
+            pass
+        finally:
+            self.depth, self.deadline, self.follow = depth, None, False
+        return move
 
     def search(self,
                game: Gobang,
@@ -127,38 +684,126 @@ class MiniMaxSearch:
                beta: float = float("inf")) -> Union[tuple, float]:
         """
         :param game: Current chess game.
+                     Moves are played and revoked in place,
+                     the game is restored before returning.
         :param depth: Current search depth. Default: 0.
         :param alpha: Current alpha value. Default: Negative infinity.
         :param beta: Current beta value. Default: Positive infinity.
         :return: If depth == 0, return the best placement position.
                  Otherwise, return the score of game.
         """
+        if self.cancelled:
+            raise Cancelled
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise Timeout
+        if not depth:
+            self.prepare(game)
+        if self.stats is not None:
+            self.stats.nodes[depth] += 1
         if depth == self.depth:
-            return self.score(game)
+            return self.evaluate(game)
+        self.line[depth] = []
+        entry, move = None, None
+        if depth and self.table is not None:
+            key, t = self.key(game)
+            entry = self.table.get(key)
+            if entry is not None and entry[4] is not None:
+                move = transform(*entry[4], game.size, INVERSE[t])
+            if entry is not None and entry[1] == self.depth - depth:
+                bound, v = entry[2:4]
+                if bound == EXACT:
+                    return v
+                if bound == LOWER:
+                    alpha = max(alpha, v)
+                else:
+                    beta = min(beta, v)
+                if alpha > beta:
+                    return v
+        moves = self.expand(game)
+        pv = self.follow and depth < len(self.pv) and self.pv[depth] in moves
+        moves = self.order(game, moves, depth, [
+            self.pv[depth] if pv else None, move
+        ])
+        if self.stats is not None:
+            self.stats.interior += 1
+        bounds = alpha, beta
         color, result = game.next, []
         value = -np.sign(color) * np.inf
-        for x, y in self.expand(game):
-            copy = game.copy()
-            if copy.play(x, y, color):
+        for x, y in moves:
+            if game.play(x, y, color):
+                game.revoke()
                 value, result = np.sign(color) * np.inf, [(x, y)]
+                self.line[depth] = [(x, y)]
                 break
-            v = self.search(copy, depth + 1, alpha, beta)
+            follow = pv and (x, y) == self.pv[depth]
+            self.evaluator.play(x, y, color)
+            try:
+                self.follow = follow
+                if not self.pvs or not result or depth + 1 == self.depth:
+                    v = self.search(game, depth + 1, alpha, beta)
+                elif color > 0:
+                    # Below the root, only a better move matters, scores
+                    # are integers, so a null window just above it is used.
+                    w = alpha + (depth > 0 and value == alpha)
+                    v = self.search(game, depth + 1, w, w)
+                    if w < v <= beta:
+                        self.follow = follow
+                        v = self.search(game, depth + 1, v, beta)
+                else:
+                    w = beta - (depth > 0 and value == beta)
+                    v = self.search(game, depth + 1, w, w)
+                    if alpha <= v < w:
+                        self.follow = follow
+                        v = self.search(game, depth + 1, alpha, v)
+            finally:
+                self.evaluator.revoke()
+                game.revoke()
             if color < 0:
-                if depth:
-                    value = min(value, v)
-                elif value == v:
+                if value == v:
                     result.append((x, y))
                 elif value > v:
                     value, result = v, [(x, y)]
+                    self.line[depth] = [(x, y)] + self.line[depth + 1]
                 beta = min(beta, value)
             else:
-                if depth:
-                    value = max(value, v)
-                elif value == v:
+                if value == v:
                     result.append((x, y))
                 elif value < v:
                     value, result = v, [(x, y)]
+                    self.line[depth] = [(x, y)] + self.line[depth + 1]
                 alpha = max(alpha, value)
             if alpha > beta:
+                if self.stats is not None:
+                    self.stats.cutoffs[depth] += 1
+                if (x, y) not in self.killers[depth]:
+                    self.killers[depth] = [(x, y)] + self.killers[depth][:1]
+                self.history[x, y] = self.history.get((x, y), 0) + (
+                    1 << (self.depth - depth)
+                )
                 break
-        return value if depth else choice(result)
+        if depth:
+            if self.table is not None:
+                bound = EXACT
+                if value <= bounds[0]:
+                    bound = UPPER
+                elif value >= bounds[1]:
+                    bound = LOWER
+                self.table.put(key, self.depth - depth, bound, value,
+                               transform(*result[0], game.size, t)
+                               if result else None)
+            return value
+        self.value, self.best = value, result
+        return self.pick(result)
+
+
+def _branch(args: tuple) -> float:
+    """
+    Search a move of the root in a worker process, see MiniMaxSearch.split.
+    """
+    settings, size, connection, history, (x, y), (alpha, beta) = args
+    if settings not in _engines:
+        _engines[settings] = MiniMaxSearch(**dict(settings))
+    game = Gobang(size, connection)
+    for move in history:
+        game.play(*move)
+    return _engines[settings].branch(game, x, y, alpha, beta)
@@ -0,0 +1,107 @@
+from time import perf_counter
+from typing import Callable, Optional
+from collections import defaultdict
+
+__all__ = ["Statistics"]
+
+
+class Statistics:
+    """
+    Statistics of a search, see MiniMaxSearch(profile=True).
+    """
+    def __init__(self):
+        self.wall = 0.
+        self.start = 0.
+        self.interior = 0
+        self.table = (0, 0)
+        self.hits = self.probes = 0
+        self.cache = (0, 0)
+        self.cache_hits = self.cache_misses = 0
+        self.calls = defaultdict(int)
+        self.times = defaultdict(float)
+        self.nodes = defaultdict(int)
+        self.cutoffs = defaultdict(int)
+
+    def __str__(self):
+        summary = self.summary()
+        return ("nodes: {nodes}, evaluations: {evaluations}, "
+                "cutoff ratio: {cutoff_ratio:.3f}, "
+                "branching factor: {branching_factor:.2f}, "
+                "table hits: {hits}/{probes}, "
+                "cache hits: {cache_hits}/{cache_probes}, "
+                "wall time: {wall:.3f}s, "
+                "phases: {phases}").format(
+            **summary, cache_probes=self.cache_hits + self.cache_misses,
+            phases=", ".join(
+                f"{name} {t:.3f}s" for name, t in summary["times"].items()
+            )
+        )
+
+    def reset(self, table=None, cache=None) -> None:
+        """
+        Reset the statistics before a search.
+        :param table: Transposition table of the search, or None.
+        :param cache: Evaluation cache of the search, or None.
+        """
+        self.__init__()
+        if table is not None:
+            self.table = table.hits, table.probes
+        if cache is not None:
+            self.cache = cache.hits, cache.misses
+        self.start = perf_counter()
+
+    def stop(self, table=None, cache=None) -> None:
+        """
+        Record the wall time, the table and the cache hits after a search.
+        :param table: Transposition table of the search, or None.
+        :param cache: Evaluation cache of the search, or None.
+        """
+        self.wall = perf_counter() - self.start
+        if table is not None:
+            self.hits = table.hits - self.table[0]
+            self.probes = table.probes - self.table[1]
+        if cache is not None:
+            self.cache_hits = cache.hits - self.cache[0]
+            self.cache_misses = cache.misses - self.cache[1]
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        """
+        :return: A wrapper of function which records its calls and time.
+        """
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.times[name] += perf_counter() - start
+                self.calls[name] += 1
+        return wrapper
+
+    def summary(self) -> dict:
+        """
+        :return: A JSON serializable summary of the statistics.
+        """
+        nodes = sum(self.nodes.values())
+        cutoffs = sum(self.cutoffs.values())
+        deepest: Optional[int] = max(self.nodes, default=None)
+        children = nodes - self.nodes.get(0, 0)
+        return {
+            "nodes": nodes,
+            "nodes_per_depth": [self.nodes[d] for d in range(
+                0 if deepest is None else deepest + 1
+            )],
+            "cutoffs_per_depth": [self.cutoffs[d] for d in range(
+                0 if deepest is None else deepest + 1
+            )],
+            "cutoff_ratio": cutoffs / self.interior if self.interior else 0.,
+            "branching_factor":
+                children / self.interior if self.interior else 0.,
+            "evaluations": self.calls["evaluate"],
+            "hits": self.hits,
+            "probes": self.probes,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "wall": self.wall,
+            "times": dict(self.times),
+            "calls": dict(self.calls)
+        }
@@ -0,0 +1,259 @@
+from typing import Optional
+
+from game import Gobang
+
+__all__ = ["ThreatSearch"]
+
+OUTSIDE = 2  # Padding of the board
+
+
+class ThreatSearch:
+    """
+    Threat-space search, which proves wins made of consecutive threats.
+    VCF (victory by continuous fours): every move of the attacker makes
+    a four, so the defender has a single forced reply.
+    VCT (victory by continuous threats): the attacker may also make threes,
+    then every defence against the three is tried.
+    Only threat-creating and threat-answering moves are searched, so wins
+    many moves deep are proved with a small number of nodes.
+    """
+    def __init__(self, depth: int = 10, threes: int = 3, nodes: int = 2000):
+        """
+        :param depth: Maximum number of moves of the attacker. Default: 10.
+        :param threes: Maximum number of threes of the attacker in VCT,
+                       the other moves of the attacker are fours. Default: 3.
+        :param nodes: Maximum number of nodes of each call. Default: 2000.
+        """
+        self.depth = depth
+        self.threes = threes
+        self.limit = nodes
+        self.nodes = 0
+        self.connection = 0
+        self.width = 0
+        self.steps = ()
+        self.board = []
+
+    def __call__(self, game: Gobang, vct: bool = True) -> Optional[tuple]:
+        """
+        Search a forced win for the player to move.
+        :param game: Current chess game, which is not modified: the search
+                     runs on a copy, so the frontiers it registers are not
+                     kept up to date by the moves of the caller.
+        :param vct: Whether to search VCT, otherwise only VCF.
+                    VCF is searched first, then VCT with more and more
+                    threes. Default: True.
+        :return: The first move of the win, None if no win is found.
+        """
+        self.nodes = 0
+        game = game.copy()
+        self.reset(game)
+        color = game.next
+        threats = set()
+        for x, y in game.frontier(1):
+            i = self.index(x, y)
+            if self.five(i, color):
+                return x, y
+            if self.five(i, -color):
+                threats.add(i)
+        for threes in range(self.threes + 1 if vct else 1):
+            i = self.attack(game, color, self.depth, threes, threats)
+            if i is not None:
+                return self.coordinate(i)
+        return None
+
+    def reset(self, game: Gobang) -> None:
+        """
+        Copy the checkerboard of the game to the board.
+        The board is a flat list padded with OUTSIDE, so that the cells of
+        a line are a slice of it, see steps.
+        """
+        n = self.connection = game.connection
+        self.width = game.size + 2 * n
+        self.steps = (1, self.width, self.width + 1, self.width - 1)
+        self.board = [OUTSIDE] * (self.width * n)
+        for row in game.checkerboard.tolist():
+            self.board += [OUTSIDE] * n + row + [OUTSIDE] * n
+        self.board += [OUTSIDE] * (self.width * n)
+
+    def index(self, x: int, y: int) -> int:
+        """
+        :return: Index of (x, y) on the board.
+        """
+        return (x + self.connection) * self.width + y + self.connection
+
+    def coordinate(self, i: int) -> tuple[int, int]:
+        """
+        :return: Coordinate of index i on the board.
+        """
+        x, y = divmod(i, self.width)
+        return x - self.connection, y - self.connection
+
+    def length(self, i: int, step: int, color: int) -> int:
+        """
+        :return: Length of the pieces of color connected by playing cell i,
+                 on the line of the step.
+        """
+        board, count = self.board, 1
+        j = i + step
+        while board[j] == color:
+            count, j = count + 1, j + step
+        j = i - step
+        while board[j] == color:
+            count, j = count + 1, j - step
+        return count
+
+    def five(self, i: int, color: int) -> bool:
+        """
+        :return: Whether color wins by playing the empty cell i.
+        """
+        return any(self.length(i, step, color) >= self.connection
+                   for step in self.steps)
+
+    def fives(self, i: int, color: int) -> set:
+        """
+        :return: Empty cells where color wins on the lines through cell i,
+                 on the same line as cell i.
+        """
+        board, cells, n = self.board, set(), self.connection
+        for step in self.steps:
+            for j in range(i - (n - 1) * step, i + n * step, step):
+                if not board[j] and self.length(j, step, color) >= n:
+                    cells.add(j)
+        return cells
+
+    def potential(self, i: int, color: int) -> int:
+        """
+        :return: The maximum number of pieces of color in a window of
+                 connection cells through cell i without other pieces.
+                 Playing cell i can only make a four if it is
+                 connection - 2, and a three if it is connection - 3.
+        """
+        best, n = 0, self.connection
+        for step in self.steps:
+            cells = self.board[i - (n - 1) * step: i + n * step: step]
+            if cells.count(color) <= best:
+                continue
+            for start in range(n):
+                window = cells[start: start + n]
+                pieces = window.count(color)
+                if pieces > best and pieces + window.count(0) == n:
+                    best = pieces
+        return best
+
+    def opens(self, i: int, color: int) -> dict:
+        """
+        :return: Cells on the lines through cell i with which color makes
+                 an open four (two cells to win), mapped to their fives.
+        """
+        board, opens = self.board, {}
+        for step in self.steps:
+            for j in range(i - (self.connection - 1) * step,
+                           i + self.connection * step, step):
+                if not board[j]:
+                    board[j] = color
+                    cells = self.fives(j, color)
+                    board[j] = 0
+                    if len(cells) > 1:
+                        opens[j] = cells
+        return opens
+
+    def candidates(self, game: Gobang, color: int, threes: bool) -> list:
+        """
+        :return: Cells of color which may make a four (or a three),
+                 the most promising first.
+        """
+        least = self.connection - (3 if threes else 2)
+        moves = []
+        for x, y in game.frontier(2):
+            i = self.index(x, y)
+            p = self.potential(i, color)
+            if p >= least:
+                moves.append((p, i))
+        return [i for _, i in sorted(moves, reverse=True)]
+
+    def play(self, game: Gobang, i: int, color: int) -> None:
+        """
+        Drop the pawn of color at cell i of both the game and the board.
+        """
+        game.play(*self.coordinate(i), color)
+        self.board[i] = color
+
+    def revoke(self, game: Gobang) -> None:
+        """
+        Undo the last action of both the game and the board.
+        """
+        self.board[self.index(*game.revoke())] = 0
+
+    def attack(self,
+               game: Gobang,
+               color: int,
+               depth: int,
+               threes: int,
+               threats: set) -> Optional[int]:
+        """
+        :param game: Current chess game, where color (the attacker) is to move
+                     and has no cell to win.
+        :param color: Color of the attacker.
+        :param depth: Remaining number of moves of the attacker.
+        :param threes: Remaining number of threes of the attacker.
+        :param threats: Cells where the defender wins.
+        :return: The first cell of a forced win, None if not found.
+        """
+        self.nodes += 1
+        threats = {i for i in threats if not self.board[i]}
+        if len(threats) > 1 or not depth or self.nodes > self.limit:
+            return None
+        if threats:
+            moves = [i for i in threats if
+                     self.potential(i, color) >= self.connection - 2]
+        else:
+            moves = self.candidates(game, color, threes > 0)
+        for i in moves:
+            self.play(game, i, color)
+            try:
+                if self.defend(game, i, color, depth, threes):
+                    return i
+            finally:
+                self.revoke(game)
+        return None
+
+    def defend(self,
+               game: Gobang,
+               i: int,
+               color: int,
+               depth: int,
+               threes: int) -> bool:
+        """
+        Try every defence after the attacker played cell i,
+        where the defender has no cell to win.
+        :return: Whether all defences lose, see attack.
+        """
+        points = self.fives(i, color)
+        if len(points) > 1:
+            return True
+        if points:
+            replies = points
+        else:
+            opens = self.opens(i, color) if threes else {}
+            if not opens:
+                return False
+            threes -= 1
+            replies = set(opens)
+            for cells in opens.values():
+                replies |= cells
+            for j in self.candidates(game, -color, False):
+                self.board[j] = -color
+                if self.fives(j, -color):
+                    replies.add(j)
+                self.board[j] = 0
+        for j in replies:
+            if self.five(j, -color):
+                return False
+            self.play(game, j, -color)
+            try:
+                if self.attack(game, color, depth - 1, threes,
+                               self.fives(j, -color)) is None:
+                    return False
+            finally:
+                self.revoke(game)
+        return True
@@ -0,0 +1,49 @@
+"""
+Measure the throughput of MiniMaxSearch.batch in boards per second.
+Usage: python -m benchmarks.batch [-n BOARDS] [-s SIZE] [--seed SEED]
+"""
+import argparse
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from game import Gobang
+from AI.search import MiniMaxSearch
+
+
+def boards(number: int, size: int = 15, seed: int = 0) -> np.ndarray:
+    """
+    Generate reproducible checkerboards by playing random moves.
+    """
+    rng = Random(seed)
+    checkerboards = np.zeros((number, size, size), np.int8)
+    for checkerboard in checkerboards:
+        game = Gobang(size)
+        for _ in range(rng.randint(0, size * size >> 1)):
+            x, y = rng.choice(game.empty)
+            if game.play(x, y):
+                break
+        checkerboard[:] = game.checkerboard
+    return checkerboards
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-n", "--number", type=int, default=10000)
+    parser.add_argument("-s", "--size", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    ai = MiniMaxSearch(1)
+    checkerboards = boards(args.number, args.size, args.seed)
+    ai.batch(checkerboards[:1])
+    start = perf_counter()
+    ai.batch(checkerboards)
+    seconds = perf_counter() - start
+    print(f"boards: {args.number}, size: {args.size}")
+    print(f"time: {seconds:.3f}s, "
+          f"throughput: {args.number / seconds:.0f} boards/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measure the speedup of the root-parallel search with the number of workers.
+Usage: python -m benchmarks.parallel [-d DEPTH] [-b BREADTH] [-n POSITIONS]
+                                     [-w WORKERS [WORKERS ...]]
+"""
+import os
+import argparse
+from time import perf_counter
+
+from AI.search import MiniMaxSearch
+from benchmarks.search import positions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-d", "--depth", type=int, default=2)
+    parser.add_argument("-b", "--breadth", type=int, default=1)
+    parser.add_argument("-n", "--number", type=int, default=3)
+    parser.add_argument("-w", "--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    games = positions(args.number)
+    print(f"positions: {args.number}, depth: {args.depth}, "
+          f"breadth: {args.breadth}, cpus: {os.cpu_count()}")
+    serial = None
+    for workers in args.workers:
+        ai = MiniMaxSearch(args.depth, args.breadth, workers=workers)
+        if workers > 1:
+            ai(games[0])  # Start the worker processes
+        best, start = [], perf_counter()
+        for game in games:
+            ai(game)
+            best.append(set(ai.best))
+        seconds = perf_counter() - start
+        ai.close()
+        if serial is None:
+            serial = seconds, best
+        print(f"workers: {workers}, time: {seconds:.3f}s, "
+              f"speedup: {serial[0] / seconds:.2f}, "
+              f"same as serial: {best == serial[1]}")
+
+
+if __name__ == "__main__":
+    main()
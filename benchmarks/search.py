@@ -0,0 +1,85 @@
+"""
+Measure the search speed of MiniMaxSearch in nodes per second.
+Usage: python -m benchmarks.search [-d DEPTH] [-b BREADTH] [-n POSITIONS]
+                                  [-e {incremental,vectorized,scalar}] [-p]
+                                  [--pvs] [-c CACHE] [--eviction {lru,clock}]
+"""
+import argparse
+from time import perf_counter
+from random import Random
+
+from game import Gobang
+from AI.search import MiniMaxSearch
+
+
+class CountingSearch(MiniMaxSearch):
+    """
+    MiniMaxSearch that counts the number of searched nodes.
+    """
+    def __init__(self, depth: int, breadth: int = 0, **kwargs):
+        super(CountingSearch, self).__init__(depth, breadth, **kwargs)
+        self.nodes = 0
+
+    def search(self, game: Gobang, *args, **kwargs):
+        self.nodes += 1
+        return super(CountingSearch, self).search(game, *args, **kwargs)
+
+
+def positions(number: int, size: int = 15, seed: int = 0) -> list:
+    """
+    Generate reproducible positions around the center of the checkerboard.
+    """
+    games, rng = [], Random(seed)
+    center = size >> 1
+    for _ in range(number):
+        game = Gobang(size)
+        game.play(center, center)
+        for _ in range(rng.randint(2, 12)):
+            while True:
+                x = center + rng.randint(-3, 3)
+                y = center + rng.randint(-3, 3)
+                if not game.checkerboard[x, y]:
+                    break
+            if game.play(x, y):
+                game.revoke()
+        games.append(game)
+    return games
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-d", "--depth", type=int, default=1)
+    parser.add_argument("-b", "--breadth", type=int, default=1)
+    parser.add_argument("-n", "--number", type=int, default=10)
+    parser.add_argument("-e", "--evaluation", default="incremental",
+                        choices=("incremental", "vectorized", "scalar"))
+    parser.add_argument("-p", "--profile", action="store_true",
+                        help="Print the statistics of each search.")
+    parser.add_argument("--pvs", action="store_true",
+                        help="Use principal variation search.")
+    parser.add_argument("-c", "--cache", type=int, default=0,
+                        help="Entries of the evaluation cache.")
+    parser.add_argument("--eviction", default="lru", choices=("lru", "clock"))
+    args = parser.parse_args()
+    ai = CountingSearch(args.depth, args.breadth,
+                        evaluation=args.evaluation, profile=args.profile,
+                        pvs=args.pvs, cache=args.cache,
+                        eviction=args.eviction)
+    start = perf_counter()
+    for game in positions(args.number):
+        ai(game)
+        if args.profile:
+            print(ai.stats)
+    seconds = perf_counter() - start
+    print(f"positions: {args.number}, depth: {args.depth}, "
+          f"breadth: {args.breadth}, evaluation: {args.evaluation}, "
+          f"pvs: {args.pvs}, cache: {args.cache}")
+    print(f"nodes: {ai.nodes}, time: {seconds:.3f}s, "
+          f"speed: {ai.nodes / seconds:.0f} nodes/s, "
+          f"nodes per move: {ai.nodes / args.number:.0f}")
+    if ai.cache is not None:
+        print(f"cache: {ai.cache.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure the startup time of the modules in fresh interpreters.
+Each statement runs in a new Python process, the time of an empty
+interpreter is subtracted, and the heavy modules it loads are listed.
+Usage: python -m benchmarks.startup [-r REPEAT] [-b BUDGET]
+"""
+import os
+import sys
+import argparse
+import subprocess
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = {
+    "config": "import AI.config",
+    "game": "import game",
+    "search": "from AI.search import MiniMaxSearch",
+    "ai": "from AI import AI; AI()",
+    "interface": "import main"
+}
+
+HEAVY = ("numpy", "pygame", "concurrent.futures.process", "AI.search")
+
+
+def measure(statement: str, repeat: int) -> tuple[float, list]:
+    """
+    :return: The best time of running the statement in a new interpreter
+             in seconds, and the heavy modules it loaded.
+    """
+    code = f"{statement}\nimport sys\nprint(*(m for m in {HEAVY!r} " \
+           f"if m in sys.modules))"
+    best, output = float("inf"), ""
+    for _ in range(repeat):
+        start = perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, check=True,
+            capture_output=True, text=True,
+            env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+        ).stdout
+        best = min(best, perf_counter() - start)
+    return best, output.split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-b", "--budget", type=float, default=0,
+                        help="Maximum startup time of the AI in milliseconds, "
+                             "the exit status is 1 if it is exceeded. "
+                             "Default: 0 (no budget).")
+    args = parser.parse_args()
+    empty, _ = measure("pass", args.repeat)
+    print(f"interpreter: {1000 * empty:.1f}ms")
+    times = {}
+    for name, statement in STATEMENTS.items():
+        try:
+            seconds, modules = measure(statement, args.repeat)
+        except subprocess.CalledProcessError as error:
+            print(f"{name}: failed ({error.stderr.strip().splitlines()[-1]})")
+            continue
+        times[name] = 1000 * (seconds - empty)
+        print(f"{name}: {times[name]:.1f}ms, "
+              f"loads: {', '.join(modules) or '-'}")
+    if args.budget and times.get("ai", float("inf")) > args.budget:
+        print(f"the startup of the AI exceeds the budget of "
+              f"{args.budget:.0f}ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
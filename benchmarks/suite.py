@@ -0,0 +1,153 @@
+"""
+Reproducible benchmark suite over a fixed corpus of positions.
+The primitives (score, expand, win, copy) and full searches at several
+depth and breadth settings are measured on opening, midgame and tactical
+positions, and the results are written as JSON for comparing commits.
+Usage: python -m benchmarks.suite [-o OUTPUT] [-r REPEAT] [--seed SEED]
+                                  [-c BASELINE] [-t THRESHOLD]
+"""
+import sys
+import json
+import platform
+import argparse
+from time import perf_counter
+from typing import Callable
+
+from game import Gobang
+from AI.search import MiniMaxSearch
+
+CORPUS = {
+    "opening-diagonal": [(7, 7), (6, 6)],
+    "opening-direct": [(7, 7), (7, 8), (8, 8)],
+    "midgame-center": [(7, 7), (6, 6), (7, 6), (7, 5), (5, 7), (6, 7),
+                       (6, 8), (6, 4), (8, 6), (9, 5), (6, 5), (8, 4),
+                       (7, 9), (4, 6), (5, 4), (4, 3), (5, 5), (5, 6)],
+    "midgame-wide": [(7, 7), (6, 6), (6, 8), (8, 6), (7, 6), (7, 5),
+                     (7, 8), (6, 4), (9, 7), (8, 4), (5, 7), (8, 7),
+                     (8, 8), (9, 8), (7, 9), (7, 10)],
+    "tactical-open-three": [(7, 5), (6, 6), (7, 6), (8, 8), (7, 7)],
+    "tactical-double-four": [(7, 4), (6, 4), (7, 5), (6, 5),
+                             (7, 6), (6, 6), (7, 7), (6, 7)]
+}
+
+SETTINGS = [(1, 1), (1, 2), (2, 1)]  # (depth, breadth) of full searches
+
+
+def position(moves: list, size: int = 15) -> Gobang:
+    """
+    :return: The game after playing the moves.
+    """
+    game = Gobang(size)
+    for x, y in moves:
+        assert not game.play(x, y), "Positions of the corpus are not over"
+    return game
+
+
+def measure(function: Callable, repeat: int) -> float:
+    """
+    :return: The best time of calling function in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run(repeat: int = 5, seed: int = 0) -> dict:
+    """
+    Run the suite.
+    :param repeat: Number of repetitions, the best time is reported.
+    :param seed: Seed of the random choices of the searches.
+    :return: Results keyed by "benchmark/position", each with its time in
+             seconds, and for searches the number of nodes and the move.
+    """
+    results = {}
+    ai = MiniMaxSearch(1, 1)
+    for name, moves in CORPUS.items():
+        game = position(moves)
+        x, y = moves[-1]
+        for benchmark, function in (
+                ("score", lambda: ai.score(game)),
+                ("expand", lambda: ai.expand(game)),
+                ("win", lambda: game.win(x, y)),
+                ("copy", lambda: game.copy())
+        ):
+            results[f"{benchmark}/{name}"] = {
+                "time": measure(function, repeat)
+            }
+    for depth, breadth in SETTINGS:
+        for name, moves in CORPUS.items():
+            best = float("inf")
+            for _ in range(repeat):
+                # A fresh game each time, as the order of its frontier
+                # depends on the moves played and revoked before.
+                ai = MiniMaxSearch(depth, breadth, profile=True, seed=seed)
+                move = ai(position(moves))
+                best = min(best, ai.stats.wall)
+            results[f"search-{depth}-{breadth}/{name}"] = {
+                "time": best,
+                "nodes": ai.stats.summary()["nodes"],
+                "move": [int(move[0]), int(move[1])]
+            }
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :return: Descriptions of the benchmarks slower than the baseline
+             by more than threshold (a ratio), or whose search changed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if result["time"] > old["time"] * (1 + threshold):
+            regressions.append(f"{name}: {old['time'] * 1000:.3f}ms -> "
+                               f"{result['time'] * 1000:.3f}ms")
+        for key in ("nodes", "move"):
+            if key in old and result[key] != old[key]:
+                regressions.append(f"{name}: {key} {old[key]} -> "
+                                   f"{result[key]}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSON output file, '-' for stdout.")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-c", "--compare", metavar="BASELINE",
+                        help="JSON results of a previous run to compare.")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                        help="Allowed slowdown ratio. Default: 0.1.")
+    args = parser.parse_args()
+    output = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": run(args.repeat, args.seed)
+    }
+    text = json.dumps(output, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(output["results"], baseline, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("no regression", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,108 @@
+from random import Random
+
 import numpy as np
 
-__all__ = ["BLACK", "WHITE", "Gobang"]
+__all__ = ["BLACK", "WHITE", "INVERSE", "transform", "Gobang"]
 
 BLACK, WHITE = 1, -1
 assert BLACK + WHITE == 0, "BLACK and WHITE must be opposite numbers"
 
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)  # Inverse of each symmetry, see transform
+
+_zobrist, _segments, _symmetries = {}, {}, {}
+
+
+def transform(x: int, y: int, size: int, t: int) -> tuple[int, int]:
+    """
+    Map (x, y) by one of the 8 symmetries of the checkerboard.
+    0 is the identity, 1-3 are rotations by 90, 180 and 270 degrees,
+    4-7 are reflections. INVERSE[t] maps the result back.
+    """
+    m = size - 1
+    return (
+        (x, y), (y, m - x), (m - x, m - y), (m - y, x),
+        (x, m - y), (m - x, y), (y, x), (m - y, m - x)
+    )[t]
+
+
+def zobrist(size: int) -> list:
+    """
+    Random 64-bit keys used for Zobrist hashing.
+    The keys are generated from a fixed seed, so they are the same
+    for every game of the same size and across runs.
+    :return: keys, where keys[x][y][color] is the key of color at (x, y).
+    """
+    if size not in _zobrist:
+        rng = Random(size)
+        _zobrist[size] = [[[0] + [rng.getrandbits(64) for _ in range(2)]
+                           for _ in range(size)] for _ in range(size)]
+    return _zobrist[size]
+
+
+def symmetries(size: int) -> list:
+    """
+    Zobrist keys of the symmetric cells, used to track the keys of the
+    8 symmetric positions of a game.
+    :return: keys, where keys[x][y][color] is a tuple of the keys of color
+             at transform(x, y, size, t) for each symmetry t.
+    """
+    if size not in _symmetries:
+        keys = zobrist(size)
+        _symmetries[size] = [[[tuple(
+            keys[u][v][color] for u, v in (
+                transform(x, y, size, t) for t in range(8)
+            )
+        ) for color in range(3)] for y in range(size)] for x in range(size)]
+    return _symmetries[size]
+
+
+def segments(size: int, connection: int = 5) -> list:
+    """
+    Masks used for bitboard win detection.
+    On a bitboard, (x, y) is bit x * (size + 1) + y. The extra bit of
+    each row is always empty, so that shifts never wrap around a row.
+    :return: segments, where segments[x][y] is a list of (mask, shift)
+             for the four directions through (x, y). The mask covers the
+             cells of the direction within distance connection - 1 of (x, y),
+             and shift is the bit distance between two adjacent cells.
+    """
+    if (size, connection) not in _segments:
+        table = [[[] for _ in range(size)] for _ in range(size)]
+        for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            shift = dx * (size + 1) + dy
+            for x in range(size):
+                for y in range(size):
+                    mask = 0
+                    for k in range(1 - connection, connection):
+                        i, j = x + k * dx, y + k * dy
+                        if 0 <= min(i, j) and max(i, j) < size:
+                            mask |= 1 << (i * (size + 1) + j)
+                    table[x][y].append((mask, shift))
+        _segments[size, connection] = table
+    return _segments[size, connection]
+
 
 class Gobang:
-    def __init__(self, size: int, connection: int = 5):
+    def __init__(self, size: int, connection: int = 5, bitboard: bool = True):
         """
         :param size: The size of the chessboard will be size x size.
         :param connection: Number of consecutive pieces required for victory.
                            Default: 5.
+        :param bitboard: Whether to keep a bitboard of each color,
+                         which makes win detection a few shifts and masks.
+                         Default: True.
         """
+        self.key = 0
+        self.keys = None
         self.size = size
         self.history = []
+        self.frontiers = {}
         self.connection = connection
+        self.zobrist = zobrist(size)
+        self.symmetries = None  # Loaded by canonical
         self.checkerboard = np.zeros((size, size), np.int8)
+        self.bits = [0, 0, 0] if bitboard else None
+        self.segments = segments(size, connection) if bitboard else None
 
     def __eq__(self, other):
         if isinstance(other, Gobang):
@@ -30,9 +116,7 @@ class Gobang:
         ])
 
     def __hash__(self):
-        return hash(int("".join(map(
-            str, self.checkerboard.flatten() // BLACK
-        )).replace("-1", "2"), 3))
+        return hash(self.key)
 
     @property
     def step(self) -> int:
@@ -62,10 +146,74 @@ class Gobang:
         """
         return np.array(np.where(self.checkerboard == 0)).T.tolist()
 
+    def frontier(self, radius: int) -> set:
+        """
+        Empty cells whose distance to some piece is at most radius
+        (in Chebyshev distance). Once requested, the frontier of the radius
+        is maintained incrementally by play and revoke.
+        :return: A set of coordinates (x, y). Do not modify it.
+        """
+        if radius not in self.frontiers:
+            cells = set()
+            counts = [[0] * self.size for _ in range(self.size)]
+            self.frontiers[radius] = counts, cells
+            for x, y in self.history:
+                self.cover(x, y, radius, 1)
+            for x, y in self.history:
+                cells.discard((x, y))
+        return self.frontiers[radius][1]
+
+    def canonical(self) -> tuple[int, int]:
+        """
+        The canonical form of the game is the one of its 8 symmetric
+        positions with the smallest Zobrist key. Once requested, the keys
+        of the symmetric positions are maintained incrementally by play and
+        revoke, so symmetric positions can share cache entries.
+        :return: (key, t), where key is the key of the canonical form and
+                 transform(x, y, size, t) maps a move to the canonical form,
+                 INVERSE[t] maps it back.
+        """
+        if self.keys is None:
+            self.symmetries = symmetries(self.size)
+            self.keys = [0] * 8
+            for x, y in self.history:
+                self.keys = [key ^ k for key, k in zip(
+                    self.keys, self.symmetries[x][y][self.checkerboard[x, y]]
+                )]
+        key = min(self.keys)
+        return key, self.keys.index(key)
+
+    def cover(self, x: int, y: int, radius: int, count: int) -> None:
+        """
+        Add count to the number of pieces near each cell around (x, y),
+        and update the frontier of radius accordingly.
+        """
+        counts, cells = self.frontiers[radius]
+        for i in range(max(0, x - radius), min(self.size, x + radius + 1)):
+            row = counts[i]
+            for j in range(max(0, y - radius), min(self.size, y + radius + 1)):
+                row[j] += count
+                if not row[j]:
+                    cells.discard((i, j))
+                elif count > 0 and row[j] == 1:
+                    cells.add((i, j))
+
     def win(self, x: int, y: int) -> bool:
         """
         :return: If piece (x, y) wins the game then return True.
         """
+        if self.bits is not None:
+            color = self.checkerboard[x, y]
+            if not color:
+                return False
+            for mask, shift in self.segments[x][y]:
+                line = self.bits[color] & mask
+                for _ in range(self.connection - 1):
+                    line &= line >> shift
+                if line:
+                    return True
+            return False
+
         def win(x0, y0, f, g):
             color, connection = self.checkerboard[x0, y0], 1
             if not color:
@@ -90,7 +238,7 @@ class Gobang:
         """
         :return: A copy of the current object.
         """
-        copy = Gobang(self.size, self.connection)
+        copy = Gobang(self.size, self.connection, self.bits is not None)
         copy.update(self.checkerboard, self.history)
         return copy
 
@@ -105,6 +253,16 @@ class Gobang:
             color = self.next
         self.checkerboard[x, y] = color
         self.history.append([x, y])
+        self.key ^= self.zobrist[x][y][color]
+        if self.keys is not None:
+            self.keys = [key ^ k for key, k in zip(
+                self.keys, self.symmetries[x][y][color]
+            )]
+        if self.bits is not None:
+            self.bits[color] |= 1 << (x * (self.size + 1) + y)
+        for radius in self.frontiers:
+            self.cover(x, y, radius, 1)
+            self.frontiers[radius][1].discard((x, y))
         return self.win(x, y)
 
     def legal(self, x: int, y: int) -> bool:
@@ -119,7 +277,19 @@ class Gobang:
         :return: Coordinate of the last action.
         """
         x, y = self.history.pop()
+        color = self.checkerboard[x, y]
+        self.key ^= self.zobrist[x][y][color]
+        if self.keys is not None:
+            self.keys = [key ^ k for key, k in zip(
+                self.keys, self.symmetries[x][y][color]
+            )]
+        if self.bits is not None:
+            self.bits[color] ^= 1 << (x * (self.size + 1) + y)
         self.checkerboard[x, y] = 0
+        for radius, (counts, cells) in self.frontiers.items():
+            self.cover(x, y, radius, -1)
+            if counts[x][y]:
+                cells.add((x, y))
         return x, y
 
     def update(self, checkerboard: np.ndarray, history: list = None) -> None:
@@ -132,7 +302,7 @@ class Gobang:
         """
         if history is None:
             history = []
-            black, white = [np.where(self.checkerboard == color).T.tolist()
+            black, white = [np.argwhere(checkerboard == color).tolist()
                             for color in (BLACK, WHITE)]
             while white:
                 history.append(black.pop())
@@ -140,10 +310,23 @@ class Gobang:
             history += black
         self.history = [c for c in history]
         self.checkerboard = checkerboard.astype(np.int8)
+        self.frontiers.clear()
+        self.key, self.keys = 0, None
+        if self.bits is not None:
+            self.bits = [0, 0, 0]
+        for x, y in self.history:
+            color = self.checkerboard[x, y]
+            self.key ^= self.zobrist[x][y][color]
+            if self.bits is not None:
+                self.bits[color] |= 1 << (x * (self.size + 1) + y)
 
     def restart(self) -> None:
         """
         Restart the game.
         """
+        self.key, self.keys = 0, None
         self.history.clear()
+        self.frontiers.clear()
+        if self.bits is not None:
+            self.bits = [0, 0, 0]
         self.checkerboard *= 0
@@ -1,7 +1,10 @@
+from time import perf_counter
+from threading import Thread
+
 import pygame as pg
 
 import game
-from AI import AI
+import AI.config as cfg
 
 SMALL, MEDIUM, LARGE = tuple(range(3))  # Used to represent font size
 EXIT, CHOOSE, PLAY, OVER = tuple(range(4))  # Used to indicate program status
@@ -21,9 +24,19 @@ class GameInterface:
         :param background: Background RGB color of game interface.
                            Default: (250, 218, 141).
         """
-        pg.init()
-        self.ai = AI()
+        pg.display.init()
+        pg.font.init()
+        self.ai = None
+        self.fonts = {}
         self.win = None
+        self.start = 0
+        self.dirty = []
+        self.glyphs = {}
+        self.thread = None
+        self.error = None
+        self.elapsed = None
+        self.decision = None
+        self.clock = pg.time.Clock()
         self.run = CHOOSE
         self.size = interface_size
         pg.display.set_caption(name)
@@ -39,8 +52,6 @@ class GameInterface:
             (self.game.size - star - 1, star),
             (self.game.size - star - 1, self.game.size - star - 1)
         )
-        self.fonts = [pg.font.Font("font.ttf", self.size[1] // k)
-                      for k in range(25, 10, -5)]
         self.colors = {
             "BG": background,
             "RED": (255, 0, 0),
@@ -56,6 +67,7 @@ class GameInterface:
         self.size0 = self.size[1] // (self.game.size << 1)
         self.right = self.left + 2 * (self.game.size - 1) * self.size0
         self.radius, self.thickness = self.size[1] // 40, self.size[1] // 200
+        self.board = self.draw_board()
         self.restart()
 
     @property
@@ -103,9 +115,10 @@ class GameInterface:
         """
         for event in pg.event.get():
             if event.type == pg.QUIT:
+                self.cancel()
                 pg.quit()
                 self.run = EXIT
-                break
+                return
             if self.run == CHOOSE and event.type == pg.MOUSEBUTTONDOWN:
                 x, y = event.pos
                 d = self.size[1] >> 3
@@ -134,30 +147,98 @@ class GameInterface:
                     self.run = PLAY
                 self.update()
                 break
-            elif self.run == PLAY:
-                if self.player[self.now] == "AI":
-                    self.wait()
-                    self.play(*self.ai(self.game.copy()))
+            elif self.run == PLAY and event.type == pg.MOUSEBUTTONDOWN:
+                x, y = event.pos
+                if self.left - self.size0 < x < self.right + self.size0:
+                    x, y = self.get_click(x, y)
+                    if self.player[self.now] == "Human" and \
+                            self.game.legal(x, y) and \
+                            not self.game.checkerboard[x, y]:
+                        self.cancel()
+                        self.play(x, y)
+                    break
+                if x > self.right and y > self.down:
+                    self.cancel()
+                    self.restart()
+                    break
+                if self.repent and x < self.left and y > self.down:
+                    self.cancel()
+                    self.revoke()
                     break
-                elif event.type == pg.MOUSEBUTTONDOWN:
-                    x, y = event.pos
-                    if self.left - self.size0 < x < self.right + self.size0:
-                        try:
-                            self.play(*self.get_click(x, y))
-                        except AssertionError:
-                            pass
-                        break
-                    if x > self.right and y > self.down:
-                        self.restart()
-                        break
-                    if self.repent and x < self.left and y > self.down:
-                        self.revoke()
-                        break
             elif self.run == OVER and event.type == pg.MOUSEBUTTONDOWN:
                 x, y = event.pos
                 if x > self.right and y > self.down:
                     self.restart()
                     break
+        if self.run == PLAY and self.player[self.now] == "AI":
+            self.think()
+        self.clock.tick(60)
+
+    def think(self) -> None:
+        """
+        Let the AI decide in a background thread without blocking the
+        interface, and play its decision once it is made.
+        """
+        if self.thread is None:
+            if self.ai is None:
+                from AI import AI
+                self.ai = AI()
+            self.decision = None
+            self.elapsed = None
+            self.start = perf_counter()
+            self.ai.resume()
+            self.thread = Thread(
+                target=self.decide, args=(self.game.copy(),), daemon=True
+            )
+            self.thread.start()
+        if self.thread.is_alive():
+            self.wait()
+            return
+        self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        if self.decision is not None:
+            self.play(*self.decision)
+            if self.run == PLAY and cfg.ponder:
+                self.ai.resume()
+                self.thread = Thread(
+                    target=self.ponder, args=(self.game.copy(),), daemon=True
+                )
+                self.thread.start()
+
+    def decide(self, chess: game.Gobang) -> None:
+        """
+        Run the AI, executed in the background thread.
+        Any other error than a cancel is kept to be raised by think
+        on the main thread.
+        """
+        from AI.search import Cancelled
+        try:
+            self.decision = self.ai(chess)
+        except Cancelled:
+            self.decision = None
+        except Exception as error:
+            self.error = error
+
+    def ponder(self, chess: game.Gobang) -> None:
+        """
+        Let the AI think on the time of human, in the background thread.
+        """
+        from AI.search import Cancelled
+        try:
+            self.ai.ponder(chess, cfg.ponder)
+        except Cancelled:
+            pass
+
+    def cancel(self) -> None:
+        """
+        Cancel the decision or pondering of the AI, if it is thinking.
+        """
+        if self.thread is not None:
+            self.ai.cancel()
+            self.thread.join()
+            self.thread = None
 
     def play(self, x: int, y: int) -> None:
         """
@@ -179,36 +260,34 @@ class GameInterface:
 
     def wait(self) -> None:
         """
-        Waiting for AI decision.
-        """
-        self.put_text(
-            self.right + self.size[0] // 60,
-            self.size[1] >> 1, "AI is thinking", "BLACK", SMALL
-        )
-        pg.display.update()
+        Waiting for AI decision, showing the elapsed thinking time.
+        The text is only redrawn when the shown time changes.
+        """
+        elapsed = "AI is thinking {:.1f}s".format(perf_counter() - self.start)
+        if elapsed == self.elapsed:
+            return
+        self.elapsed = elapsed
+        x, y = self.right + self.size[0] // 60, self.size[1] >> 1
+        self.erase(x, y, self.size[0], self.font(SMALL).get_height())
+        self.put_text(x, y, elapsed, "BLACK", SMALL, cache=False)
+        self.flip()
 
     def erase(self, x1: int, y1: int, x2: int, y2: int) -> None:
         """
         Erase the contents of rectangular region (x1, y1, x2, y2).
         """
-        pg.draw.rect(self.interface, self.colors["BG"], (x1, y1, x2, y2))
+        self.dirty.append(pg.draw.rect(
+            self.interface, self.colors["BG"], (x1, y1, x2, y2)
+        ))
 
     def revoke(self) -> None:
         """
         Current player repents once.
         """
-        last = self.game.revoke()
-        x, y = self.transform(*last)
-        self.draw_circle(x, y, self.radius, "BG")
-        self.draw_line(x - self.radius, y, x + self.radius, y)
-        self.draw_line(x, y - self.radius, x, y + self.radius)
-        if last in self.stars:
-            self.draw_circle(
-                self.left + 2 * self.size0 * last[0],
-                (2 * last[1] + 1) * self.size0,
-                self.thickness << 1,
-                "BLACK"
-            )
+        x, y = self.transform(*self.game.revoke())
+        cell = pg.Rect(0, 0, 2 * self.radius + 2, 2 * self.radius + 2)
+        cell.center = x, y
+        self.dirty.append(self.interface.blit(self.board, cell, cell))
         if self.player[self.now] == "AI":
             self.revoke()
         elif self.game.step:
@@ -262,7 +341,14 @@ class GameInterface:
                     self.right + self.radius,
                     self.size[1] >> 1, winner, "BLACK", SMALL
                 )
-        pg.display.update()
+        self.flip()
+
+    def flip(self) -> None:
+        """
+        Show the regions of the interface changed since the last flip.
+        """
+        pg.display.update(self.dirty)
+        self.dirty.clear()
 
     def restart(self) -> None:
         """
@@ -271,6 +357,16 @@ class GameInterface:
         self.win = None
         self.run = CHOOSE
         self.game.restart()
+        self.interface.blit(self.board, (0, 0))
+        self.dirty.append(self.interface.get_rect())
+        self.update()
+
+    def draw_board(self) -> pg.Surface:
+        """
+        Draw the empty checkerboard once.
+        :return: A copy of the interface with the empty checkerboard,
+                 which is blitted to clear the board or a cell of it.
+        """
         self.interface.fill(self.colors["BG"])
         y = (2 * self.game.size - 1) * self.size0
         for line in range(1, self.game.size << 1, 2):
@@ -285,7 +381,8 @@ class GameInterface:
                 self.thickness << 1,
                 "BLACK"
             )
-        self.update()
+        self.dirty.clear()
+        return self.interface.copy()
 
     def transform(self, x: int, y: int) -> tuple[int, int]:
         """
@@ -293,8 +390,13 @@ class GameInterface:
         """
         return self.left + 2 * x * self.size0, (2 * y + 1) * self.size0
 
-    def put_text(self, x: int, y: int, text: str, color: str, font: int) -> \
-            None:
+    def put_text(self,
+                 x: int,
+                 y: int,
+                 text: str,
+                 color: str,
+                 font: int,
+                 cache: bool = True) -> None:
         """
         Display text on the interface.
         :param x: The x-coordinate of the upper-left corner of the text.
@@ -302,8 +404,26 @@ class GameInterface:
         :param text: Text content.
         :param color: Color of text.
         :param font: Font size, can be SMALL, MEDIUM or LARGE.
+        :param cache: Whether to keep the rendered text for later calls,
+                      for the fixed labels. Default: True.
+        """
+        glyph = self.glyphs.get((text, color, font))
+        if glyph is None:
+            glyph = self.font(font).render(text, True, color)
+            if cache:
+                self.glyphs[text, color, font] = glyph
+        self.dirty.append(self.interface.blit(glyph, (x, y)))
+
+    def font(self, size: int) -> pg.font.Font:
         """
-        self.interface.blit(self.fonts[font].render(text, True, color), (x, y))
+        Load the font of the size when it is first used.
+        :param size: Font size, can be SMALL, MEDIUM or LARGE.
+        """
+        if size not in self.fonts:
+            self.fonts[size] = pg.font.Font(
+                "font.ttf", self.size[1] // (25 - 5 * size)
+            )
+        return self.fonts[size]
 
     def get_click(self, x: int, y: int) -> tuple[int, int]:
         """
@@ -317,12 +437,12 @@ class GameInterface:
         """
         Draw a line from (x1, y1) to (x2, y2).
         """
-        pg.draw.line(
+        self.dirty.append(pg.draw.line(
             self.interface,
             self.colors["BLACK"],
             (x1, y1), (x2, y2),
             self.thickness
-        )
+        ))
 
     def draw_circle(self, x: int, y: int, r: int, color: str) -> None:
         """
@@ -332,7 +452,9 @@ class GameInterface:
         :param r: Radius of circle.
         :param color: Color of circle.
         """
-        pg.draw.circle(self.interface, self.colors[color], (x, y), r)
+        self.dirty.append(
+            pg.draw.circle(self.interface, self.colors[color], (x, y), r)
+        )
 
 
 if __name__ == "__main__":
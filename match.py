@@ -0,0 +1,110 @@
+"""
+Headless AI vs AI matches, without pygame.
+Results and move lists are streamed as JSON lines, and the throughput
+and latency statistics are reported when all games are over.
+Usage: python match.py [-n GAMES] [-p PROCESSES] [-o OUTPUT] ...
+"""
+import sys
+import json
+import argparse
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from game import Gobang, BLACK
+from record import Writer
+from AI.search import MiniMaxSearch
+
+
+def play(index: int, args: argparse.Namespace) -> dict:
+    """
+    Play a game between two AIs.
+    :param index: Index of the game, which also seeds its randomness.
+    :param args: Command line arguments.
+    :return: The record of the game.
+    """
+    game = Gobang(args.size)
+    players = {color: MiniMaxSearch(
+        getattr(args, f"{name}_depth"),
+        getattr(args, f"{name}_breadth"),
+        args.table,
+        budget=getattr(args, f"{name}_budget"),
+        seed=args.seed + index,
+        threat=getattr(args, f"{name}_threat")
+    ) for color, name in ((BLACK, "black"), (-BLACK, "white"))}
+    winner, times = None, []
+    while not game.full:
+        color = game.next
+        start = perf_counter()
+        x, y = players[color](game)
+        times.append(1000 * (perf_counter() - start))
+        if game.play(x, y, color):
+            winner = color
+            break
+    return {
+        "game": index,
+        "winner": {None: None, BLACK: "black", -BLACK: "white"}[winner],
+        "moves": [[int(x), int(y)] for x, y in game.history],
+        "times": [round(t, 3) for t in times]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-n", "--games", type=int, default=10)
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="Number of games played in parallel.")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL output file, '-' for stdout.")
+    parser.add_argument("-r", "--record",
+                        help="Also write the games as a record file, "
+                             "see record.py.")
+    parser.add_argument("-s", "--size", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--table", type=int, default=1 << 16,
+                        help="Transposition table size of each AI.")
+    for name in ("black", "white"):
+        parser.add_argument(f"--{name}-depth", type=int, default=1)
+        parser.add_argument(f"--{name}-breadth", type=int, default=1)
+        parser.add_argument(f"--{name}-budget", type=int, default=0,
+                            help="Time budget of each move in milliseconds.")
+        parser.add_argument(f"--{name}-threat", default="",
+                            choices=("", "vcf", "vct"),
+                            help="Threat-space search before alpha-beta.")
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    writer = Writer(args.record) if args.record else None
+    results, times = {"black": 0, "white": 0, None: 0}, []
+    start = perf_counter()
+    with ProcessPoolExecutor(args.processes) as pool:
+        futures = [pool.submit(play, i, args) for i in range(args.games)]
+        for future in as_completed(futures):
+            record = future.result()
+            results[record["winner"]] += 1
+            times += record["times"]
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            if writer is not None:
+                writer.write(record["moves"], {
+                    "black": BLACK, "white": -BLACK, None: 0
+                }[record["winner"]], args.size)
+    seconds = perf_counter() - start
+    if output is not sys.stdout:
+        output.close()
+    if writer is not None:
+        writer.close()
+
+    p50, p90, p99 = np.percentile(times, (50, 90, 99)) if times else [0] * 3
+    print(f"games: {args.games}, black wins: {results['black']}, "
+          f"white wins: {results['white']}, ties: {results[None]}",
+          file=sys.stderr)
+    print(f"time: {seconds:.3f}s, {args.games / seconds:.3f} games/s, "
+          f"{len(times) / seconds:.1f} moves/s", file=sys.stderr)
+    print(f"move latency (ms): p50 {p50:.1f}, p90 {p90:.1f}, "
+          f"p99 {p99:.1f}, max {max(times, default=0):.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Build the opening book of the AI from self-play games,
+and from the game records written by match.py or record.py.
+Usage: python opening.py [-n GAMES] [-p PLIES] [-i GAMES.jsonl|GAMES.rec ...]
+"""
+import json
+import argparse
+
+from game import Gobang, BLACK
+from AI.search import MiniMaxSearch
+from AI.book import BOOK, collect, write
+from record import Reader, decode
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("-o", "--output", default=BOOK)
+    parser.add_argument("-i", "--input", nargs="*", default=[],
+                        help="JSONL game records of match.py, "
+                             "or record files (.rec) of record.py to add.")
+    parser.add_argument("-n", "--games", type=int, default=20,
+                        help="Number of self-play games to add.")
+    parser.add_argument("-p", "--plies", type=int, default=8,
+                        help="Number of opening moves of each game to add.")
+    parser.add_argument("-m", "--minimum", type=int, default=1,
+                        help="Minimum number of games of a book move.")
+    parser.add_argument("-d", "--depth", type=int, default=1)
+    parser.add_argument("-b", "--breadth", type=int, default=1)
+    parser.add_argument("-s", "--size", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    statistics = {}
+    for path in args.input:
+        if path.endswith(".rec"):
+            with Reader(path) as reader:
+                for size, connection, winner, moves in reader:
+                    collect(statistics, decode(moves), winner or None,
+                            args.plies, size, connection)
+            continue
+        with open(path) as file:
+            for line in file:
+                record = json.loads(line)
+                winner = {"black": BLACK, "white": -BLACK}
+                collect(statistics, record["moves"],
+                        winner.get(record["winner"]), args.plies, args.size)
+    for index in range(args.games):
+        game, winner = Gobang(args.size), None
+        ai = MiniMaxSearch(args.depth, args.breadth, seed=args.seed + index)
+        while not game.full:
+            color = game.next
+            if game.play(*ai(game), color):
+                winner = color
+                break
+        collect(statistics, game.history, winner, args.plies, args.size)
+    count = write(args.output, statistics, args.size, games=args.minimum)
+    print(f"positions: {len(statistics)}, records: {count}, "
+          f"output: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Compact binary game records.
+A record file is a header followed by games, each game is a header
+(size, connection, winner, number of moves) followed by one byte per move,
+x << 4 | y, so boards up to 16x16 are supported.
+The reader memory-maps the file and replays the games lazily.
+Converts the JSON lines written by match.py to a record file.
+Usage: python record.py GAMES.jsonl [GAMES.jsonl ...] -o GAMES.rec
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+import argparse
+from typing import Iterator
+
+from game import BLACK, WHITE, Gobang
+
+__all__ = ["HEADER", "GAME", "encode", "decode", "Writer", "Reader"]
+
+HEADER = struct.Struct("<4sHI")  # Magic, version, number of games
+GAME = struct.Struct("<BBbH")  # Size, connection, winner, number of moves
+MAGIC, VERSION = b"GOBR", 1
+
+
+def encode(moves: list) -> bytes:
+    """
+    :return: One byte x << 4 | y of each move.
+    """
+    return bytes(x << 4 | y for x, y in moves)
+
+
+def decode(data: bytes) -> list:
+    """
+    :return: Moves of the bytes, see encode.
+    """
+    return [(code >> 4, code & 15) for code in data]
+
+
+class Writer:
+    """
+    Append games to a record file.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: Path of the record file, which is overwritten.
+        """
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self,
+              moves: list,
+              winner: int = 0,
+              size: int = 15,
+              connection: int = 5) -> None:
+        """
+        :param moves: Moves of the game.
+        :param winner: Color of the winner, 0 if there is no winner.
+                       Default: 0.
+        :param size: The size of the chessboard, at most 16. Default: 15.
+        :param connection: Number of consecutive pieces required for victory.
+                           Default: 5.
+        """
+        assert size <= 16, "Records only support boards up to 16x16"
+        assert winner in (BLACK, WHITE, 0), f"Bad winner {winner}"
+        self.file.write(GAME.pack(size, connection, winner, len(moves)))
+        self.file.write(encode(moves))
+        self.count += 1
+
+    def close(self) -> None:
+        """
+        Write the number of games into the header and close the file.
+        """
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.count))
+        self.file.close()
+
+
+class Reader:
+    """
+    Read-only record file.
+    The file is memory-mapped and the moves of each game are a memoryview
+    of the map, so reading a game copies nothing.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: Path of the record file.
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.data)
+        assert magic == MAGIC and version == VERSION, f"Bad records {path}"
+        self.view = memoryview(self.data)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self) -> Iterator[tuple[int, int, int, memoryview]]:
+        """
+        :return: Iterator of (size, connection, winner, moves) of the games,
+                 where moves is a memoryview of the bytes of the moves,
+                 valid until the reader is closed.
+        """
+        i = HEADER.size
+        for _ in range(self.count):
+            size, connection, winner, n = GAME.unpack_from(self.data, i)
+            i += GAME.size
+            yield size, connection, winner, self.view[i: i + n]
+            i += n
+
+    def positions(self) -> Iterator[tuple[Gobang, int]]:
+        """
+        Replay the games.
+        The same Gobang is reused by the games of the same size, so it must
+        be copied to be kept after the next step of the iteration.
+        :return: Iterator of (game, winner) after every move of every game.
+        """
+        games = {}
+        for size, connection, winner, moves in self:
+            game = games.get((size, connection))
+            if game is None:
+                game = games[size, connection] = Gobang(size, connection)
+            else:
+                game.restart()
+            for code in moves:
+                game.play(code >> 4, code & 15)
+                yield game, winner
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmap the record file.
+        If views of moves are still alive, the file is unmapped when
+        they are freed.
+        """
+        self.view.release()
+        try:
+            self.data.close()
+        except BufferError:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("input", nargs="+",
+                        help="JSONL game records of match.py.")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("-s", "--size", type=int, default=15)
+    args = parser.parse_args()
+    winners = {"black": BLACK, "white": WHITE, None: 0}
+    with Writer(args.output) as writer:
+        for path in args.input:
+            with open(path) as file:
+                for line in file:
+                    record = json.loads(line)
+                    writer.write(record["moves"], winners[record["winner"]],
+                                 args.size)
+    print(f"games: {writer.count}, bytes: {os.path.getsize(args.output)}, "
+          f"output: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
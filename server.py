@@ -0,0 +1,475 @@
+"""
+Serve many concurrent games from one process.
+Clients send requests as JSON lines over TCP and receive one JSON line
+for each request, with the "id" of the request if it has one.
+Each session keeps its own game and AI, the searches are scheduled
+round-robin over the sessions onto a bounded pool of worker threads,
+and the pattern tables and the opening book are loaded once and shared.
+Requests:
+    {"op": "new", "size": 15, "depth": 1, "breadth": 1} -> {"session": 1}
+    {"op": "play", "session": 1, "x": 7, "y": 7} -> {"winner": null}
+    {"op": "move", "session": 1, "budget": 500} -> {"x": 8, "y": 8, ...}
+    {"op": "undo", "session": 1} -> {"x": 8, "y": 8}
+    {"op": "close", "session": 1} -> {}
+    {"op": "metrics"} -> {"queue": 0, "latency": {...}, ...}
+Failed requests are answered with {"error": "..."}.
+Usage: python server.py [--host HOST] [--port PORT] [-w WORKERS] ...
+"""
+import os
+import json
+import asyncio
+import logging
+import argparse
+from functools import partial
+from time import perf_counter
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import AI.config as cfg
+from game import Gobang
+from AI.book import BOOK, Book
+from AI.patterns import LENGTH, lines, patterns
+from AI.search import MiniMaxSearch, Cancelled
+
+logger = logging.getLogger("server")
+
+
+class Session:
+    """
+    A game and the AI playing it.
+    The game is changed by one request at a time: moves and undos are
+    refused while a search of the session is waiting or running.
+    Once the game is over, moves are refused until a move is undone.
+    """
+    def __init__(self, number: int, game: Gobang, ai: MiniMaxSearch):
+        self.number = number
+        self.game = game
+        self.ai = ai
+        self.result = None  # Winner of the game once it is over, 0 for a tie
+        self.pending = deque()  # (budget, future, enqueue time) of searches
+        self.busy = False
+        self.closed = False
+
+    @property
+    def idle(self) -> bool:
+        """
+        :return: Whether no search of the session is waiting or running.
+        """
+        return not (self.busy or self.pending)
+
+    def think(self, budget: int) -> dict:
+        """
+        Search and play the move of the AI, run by a worker thread.
+        :param budget: Time budget of the search in milliseconds.
+        :return: The move, the winner and the search time in milliseconds.
+        """
+        if self.result is not None:
+            raise ValueError("The game is over")
+        self.ai.budget = budget
+        start = perf_counter()
+        x, y = map(int, self.ai(self.game))
+        seconds = perf_counter() - start
+        self.result = winner(self.game, self.game.play(x, y))
+        return {"x": x, "y": y, "winner": self.result,
+                "time": round(1000 * seconds, 3)}
+
+
+class Metrics:
+    """
+    Latency and throughput of the searches.
+    """
+    def __init__(self, window: int = 1000):
+        """
+        :param window: Number of recent searches kept for the latencies.
+                       Default: 1000.
+        """
+        self.start = perf_counter()
+        self.searches = self.failures = 0
+        self.waits = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+
+    def record(self, wait: float, latency: float, failed: bool) -> None:
+        """
+        :param wait: Time spent in the queue in seconds.
+        :param latency: Time from the request to the result in seconds.
+        :param failed: Whether the search failed or was cancelled.
+        """
+        self.searches += 1
+        self.failures += failed
+        self.waits.append(1000 * wait)
+        self.latencies.append(1000 * latency)
+
+    def summary(self) -> dict:
+        """
+        :return: Percentiles of the recent waits and latencies in
+                 milliseconds, and the searches per second since the start.
+        """
+        seconds = perf_counter() - self.start
+        summary = {"searches": self.searches, "failures": self.failures,
+                   "throughput": round(self.searches / seconds, 3)}
+        for name, times in (("wait", self.waits),
+                            ("latency", self.latencies)):
+            p50, p95, p99 = np.percentile(times, (50, 95, 99)) if times \
+                else [0] * 3
+            summary[name] = {
+                key: round(float(value), 3) for key, value in (
+                    ("p50", p50), ("p95", p95), ("p99", p99),
+                    ("max", max(times, default=0))
+                )
+            }
+        return summary
+
+
+class Scheduler:
+    """
+    Fair scheduler of the searches of the sessions.
+    Sessions with waiting searches form a ring, and whenever a worker is
+    free, one search of the session at the head of the ring is started,
+    so a session with many requests can not starve the others.
+    """
+    def __init__(self, workers: int = 2):
+        """
+        :param workers: Maximum number of searches running at once.
+                        Default: 2.
+        """
+        self.workers = workers
+        self.running = 0
+        self.waiting = 0
+        self.ring = deque()
+        self.metrics = Metrics()
+        self.pool = ThreadPoolExecutor(workers, "search")
+
+    def submit(self, session: Session, budget: int) -> asyncio.Future:
+        """
+        Queue a search of the session.
+        :return: Future of the result of Session.think.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if session.idle:
+            self.ring.append(session)
+        session.pending.append((budget, future, perf_counter()))
+        self.waiting += 1
+        self.dispatch()
+        return future
+
+    def dispatch(self) -> None:
+        """
+        Start waiting searches while there are free workers.
+        """
+        loop = asyncio.get_running_loop()
+        while self.running < self.workers and self.ring:
+            session = self.ring.popleft()
+            budget, future, enqueued = session.pending.popleft()
+            self.waiting -= 1
+            if future.cancelled():
+                self.requeue(session)
+                continue
+            session.busy = True
+            session.ai.resume()
+            self.running += 1
+            task = loop.run_in_executor(self.pool, session.think, budget)
+            task.add_done_callback(partial(
+                self.finish, session, future, enqueued, perf_counter()
+            ))
+
+    def finish(self,
+               session: Session,
+               future: asyncio.Future,
+               enqueued: float,
+               started: float,
+               task: asyncio.Future) -> None:
+        """
+        Deliver the result of a search and start the next ones.
+        """
+        self.running -= 1
+        session.busy = False
+        error = task.exception()
+        self.metrics.record(started - enqueued, perf_counter() - enqueued,
+                            error is not None)
+        if not future.done():
+            if session.closed:
+                future.cancel()
+            elif error is None:
+                future.set_result(task.result())
+            else:
+                future.set_exception(error)
+        self.requeue(session)
+        self.dispatch()
+
+    def requeue(self, session: Session) -> None:
+        """
+        Put the session back at the tail of the ring if it has searches.
+        """
+        if session.pending and not session.closed:
+            self.ring.append(session)
+
+    def cancel(self, session: Session) -> None:
+        """
+        Drop the waiting searches of the session and cancel the running one.
+        """
+        session.closed = True
+        if session in self.ring:
+            self.ring.remove(session)
+        while session.pending:
+            _, future, _ = session.pending.popleft()
+            self.waiting -= 1
+            future.cancel()
+        if session.busy:
+            session.ai.cancel()
+
+    def close(self) -> None:
+        """
+        Shut down the worker threads.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Server:
+    """
+    JSON lines server of the Gobang sessions.
+    """
+    def __init__(self,
+                 workers: int = 2,
+                 budget: int = 1000,
+                 limit: int = 10000,
+                 table: int = 1 << 16,
+                 capacity: int = 1000):
+        """
+        :param workers: Maximum number of searches running at once.
+                        Default: 2.
+        :param budget: Default time budget of a search in milliseconds.
+                       Default: 1000.
+        :param limit: Maximum time budget of a search in milliseconds.
+                      Default: 10000.
+        :param table: Transposition table size of each session.
+                      Default: 1 << 16.
+        :param capacity: Maximum number of open sessions. Default: 1000.
+        """
+        self.budget = budget
+        self.limit = limit
+        self.table = table
+        self.capacity = capacity
+        self.count = 0
+        self.sessions = {}
+        self.tables = {}  # Futures of the line tables, keyed by size
+        self.scheduler = Scheduler(workers)
+        self.book = Book(BOOK) if cfg.book and os.path.exists(BOOK) else None
+        self.operations = {
+            "new": self.new,
+            "play": self.play,
+            "move": self.move,
+            "undo": self.undo,
+            "close": self.close,
+            "metrics": self.metrics
+        }
+
+    def session(self, request: dict) -> Session:
+        """
+        :return: The session of the request.
+        """
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ValueError(f"Unknown session {request.get('session')}")
+        return session
+
+    async def new(self, request: dict, owned: set) -> dict:
+        """
+        Open a session, which is closed with the connection opening it.
+        """
+        size = int(request.get("size", 15))
+        if not 5 <= size <= LENGTH:
+            raise ValueError(f"Bad size {size}, sizes are 5 to {LENGTH}")
+        # The line table of each size is built once off the event loop,
+        # before any search needs it, and shared by all the sessions.
+        if size not in self.tables:
+            self.tables[size] = asyncio.get_running_loop().run_in_executor(
+                None, lines, size, patterns()
+            )
+        try:
+            await self.tables[size]
+        except Exception:
+            self.tables.pop(size, None)
+            raise
+        if len(self.sessions) >= self.capacity:
+            raise RuntimeError("Too many sessions")
+        self.count += 1
+        self.sessions[self.count] = Session(self.count, Gobang(size),
+                                            MiniMaxSearch(
+            int(request.get("depth", cfg.depth)),
+            int(request.get("breadth", cfg.breadth)),
+            self.table,
+            cfg.policy,
+            threat=cfg.threat,
+            threat_nodes=cfg.threat_nodes,
+            book=self.book,
+            pvs=cfg.pvs,
+            aspiration=cfg.aspiration,
+            deterministic=cfg.deterministic,
+            seed=request.get("seed")
+        ))
+        owned.add(self.count)
+        return {"session": self.count}
+
+    async def play(self, request: dict, owned: set) -> dict:
+        """
+        Play a move of the client.
+        """
+        session = self.session(request)
+        x, y = int(request["x"]), int(request["y"])
+        game = session.game
+        if not session.idle:
+            raise RuntimeError("The AI of the session is thinking")
+        if session.result is not None:
+            raise ValueError("The game is over")
+        if not game.legal(x, y) or game.checkerboard[x, y]:
+            raise ValueError(f"Illegal move ({x}, {y})")
+        session.result = winner(game, game.play(x, y))
+        return {"winner": session.result}
+
+    async def move(self, request: dict, owned: set) -> dict:
+        """
+        Search and play a move of the AI.
+        """
+        session = self.session(request)
+        if session.result is not None:
+            raise ValueError("The game is over")
+        budget = min(int(request.get("budget", self.budget)), self.limit)
+        return await self.scheduler.submit(session, max(budget, 1))
+
+    async def undo(self, request: dict, owned: set) -> dict:
+        """
+        Undo the last move, which reopens a game that is over.
+        """
+        session = self.session(request)
+        if not session.idle:
+            raise RuntimeError("The AI of the session is thinking")
+        if not session.game.history:
+            raise ValueError("Nothing to undo")
+        x, y = session.game.revoke()
+        session.result = None
+        return {"x": int(x), "y": int(y)}
+
+    async def close(self, request: dict, owned: set) -> dict:
+        """
+        Close a session, cancelling its searches.
+        """
+        session = self.sessions.pop(self.session(request).number)
+        owned.discard(session.number)
+        self.scheduler.cancel(session)
+        return {}
+
+    async def metrics(self, request: dict, owned: set) -> dict:
+        """
+        :return: Sessions, queue depth, running searches, latencies and
+                 throughput.
+        """
+        return {
+            "sessions": len(self.sessions),
+            "queue": self.scheduler.waiting,
+            "running": self.scheduler.running,
+            "workers": self.scheduler.workers,
+            **self.scheduler.metrics.summary()
+        }
+
+    async def respond(self,
+                      line: bytes,
+                      owned: set,
+                      writer: asyncio.StreamWriter) -> None:
+        """
+        Answer a request line.
+        """
+        response = {}
+        try:
+            request = json.loads(line)
+            if "id" in request:
+                response["id"] = request["id"]
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(f"Unknown op {request.get('op')}")
+            response.update(await operation(request, owned))
+        except (Cancelled, asyncio.CancelledError):
+            response["error"] = "Cancelled"
+        except Exception as error:
+            response["error"] = str(error) or type(error).__name__
+        try:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Serve a connection. Requests are answered as soon as they are done,
+        so the searches of different sessions of a connection overlap.
+        """
+        owned, tasks = set(), set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, owned, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            for number in owned:
+                self.scheduler.cancel(self.sessions.pop(number))
+            if tasks:
+                await asyncio.wait(tasks)
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        """
+        Serve until cancelled.
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info("serving on %s:%d with %d workers", host, port,
+                    self.scheduler.workers)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.scheduler.close()
+
+
+def winner(game: Gobang, win: bool):
+    """
+    :return: Color of the winner after the last move, 0 for a tie,
+             None if the game is not over.
+    """
+    if win:
+        return int(game.checkerboard[tuple(game.history[-1])])
+    return 0 if game.full else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-w", "--workers", type=int, default=2,
+                        help="Maximum number of searches running at once.")
+    parser.add_argument("-b", "--budget", type=int, default=1000,
+                        help="Default time budget of a move in milliseconds.")
+    parser.add_argument("-l", "--limit", type=int, default=10000,
+                        help="Maximum time budget of a move in milliseconds.")
+    parser.add_argument("-s", "--sessions", type=int, default=1000,
+                        help="Maximum number of open sessions.")
+    parser.add_argument("--table", type=int, default=1 << 16,
+                        help="Transposition table size of each session.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    server = Server(args.workers, args.budget, args.limit,
+                    args.table, args.sessions)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()